@@ -0,0 +1,104 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+
+def prepare(path, products):
+    # Режим журнала хранится в файле базы: оба варианта работают с WAL и synchronous = FULL,
+    # как db.open_connection, и разница в результатах приходится только на пул соединений
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute('''CREATE TABLE Товары (
+                            ID_товара INTEGER PRIMARY KEY,
+                            Наименование TEXT NOT NULL,
+                            Вес TEXT NOT NULL,
+                            Стоимость TEXT NOT NULL,
+                            Количество INTEGER DEFAULT 0
+                         )''')
+    connection.executemany("INSERT INTO Товары (Наименование, Вес, Стоимость, Количество) VALUES (?, ?, ?, ?)",
+                           [(f"Товар {i}", "100", "10.00", 1000) for i in range(products)])
+    connection.commit()
+    connection.close()
+
+
+# Старый вариант: новое соединение на каждый запрос
+def per_call_read(path, product_id):
+    connection = sqlite3.connect(path, timeout=db.BUSY_TIMEOUT_MS / 1000)
+    cursor = connection.cursor()
+    cursor.execute("SELECT Стоимость FROM Товары WHERE ID_товара = ?", (product_id,))
+    result = cursor.fetchone()
+    connection.close()
+    return result
+
+
+def per_call_write(path, product_id):
+    connection = sqlite3.connect(path, timeout=db.BUSY_TIMEOUT_MS / 1000)
+    connection.execute("PRAGMA synchronous = FULL")
+    cursor = connection.cursor()
+    cursor.execute("UPDATE Товары SET Количество = Количество - 1 WHERE ID_товара = ?", (product_id,))
+    connection.commit()
+    connection.close()
+
+
+def pooled_read(path, product_id):
+    return db.fetch_one("SELECT Стоимость FROM Товары WHERE ID_товара = ?", (product_id,))
+
+
+def pooled_write(path, product_id):
+    db.execute("UPDATE Товары SET Количество = Количество - 1 WHERE ID_товара = ?", (product_id,))
+
+
+def run(func, path, statements, products, threads):
+    per_thread = statements // threads
+
+    def worker(offset):
+        for i in range(per_thread):
+            func(path, (offset + i) % products + 1)
+
+    workers = [threading.Thread(target=worker, args=(n * per_thread,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение соединения на запрос и пула соединений")
+    parser.add_argument("--statements", type=int, default=20000)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        prepare(path, args.products)
+
+        results = [
+            ("чтение, соединение на запрос", run(per_call_read, path, args.statements, args.products, args.threads)),
+            ("запись, соединение на запрос", run(per_call_write, path, args.statements // 10, args.products,
+                                                 args.threads)),
+        ]
+        db.configure(path)
+        results += [
+            ("чтение, пул", run(pooled_read, path, args.statements, args.products, args.threads)),
+            ("запись, пул", run(pooled_write, path, args.statements // 10, args.products, args.threads)),
+        ]
+        db.get_pool().close()
+
+    print("журнал: WAL, synchronous: FULL в обоих вариантах")
+    for name, rate in results:
+        print(f"{name:<32} {rate:>12.0f} запросов/с")
+
+
+if __name__ == "__main__":
+    main()
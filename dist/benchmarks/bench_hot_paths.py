@@ -0,0 +1,118 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import catalog
+import db
+import profiler
+import reports
+import services
+
+# Замер основных операций приложения на базе, заполненной generate_data.py:
+#   python benchmarks/generate_data.py /tmp/bench.db --orders 1000000
+#   python benchmarks/bench_hot_paths.py /tmp/bench.db --profile
+# Оформление и отмена заказов изменяют базу, но возвращают остатки к исходным.
+
+
+def cold_products():
+    catalog.get_catalog().close()
+    return len(services.get_all_products())
+
+
+def warm_products():
+    return len(services.get_all_products())
+
+
+def all_orders():
+    return len(services.get_all_orders())
+
+
+def first_page(factory, pages=1):
+    # То, что читает открытая таблица: первая страница и прокрутка ещё на pages - 1 страниц
+    model = factory()
+    model.refresh()
+    for _ in range(pages - 1):
+        model.fetchMore()
+    return model.rowCount()
+
+
+def busiest_user():
+    return db.fetch_one("SELECT ID_пользователя FROM Заказы GROUP BY ID_пользователя "
+                        "ORDER BY COUNT(*) DESC LIMIT 1")[0]
+
+
+def place_and_cancel(count):
+    user_id = busiest_user()
+    products = [product for product in services.get_all_products() if product.quantity > 0][:count]
+
+    def run():
+        order_ids = []
+        for product in products:
+            order_ids.extend(services.place_order(user_id, [(product.id, 1)]))
+        for order_id in order_ids:
+            services.cancel_order(order_id, user_id)
+        return len(order_ids)
+    return run
+
+
+def cases(directory, orders_count):
+    import tables
+
+    receipt_user = busiest_user()
+    return [
+        ("get_all_products (холодный кэш)", cold_products),
+        ("get_all_products (кэш)", warm_products),
+        ("get_all_orders", all_orders),
+        ("таблица товаров, 1 страница", lambda: first_page(tables.products_model)),
+        ("таблица заказов, 5 страниц", lambda: first_page(tables.orders_model, 5)),
+        ("view_changes, 1 страница", lambda: first_page(tables.changes_model)),
+        ("view_changes, 5 страниц", lambda: first_page(tables.changes_model, 5)),
+        ("отчёт о складе", lambda: reports.write_stock_report(os.path.join(directory, "stock.xlsx"))),
+        ("отчёт по заказам", lambda: reports.write_orders_report(os.path.join(directory, "orders.xlsx"))),
+        ("чек пользователя", lambda: reports.write_receipt(receipt_user, os.path.join(directory, "receipt.xlsx"))),
+        (f"оформление и отмена {orders_count} заказов", place_and_cancel(orders_count)),
+    ]
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время основных операций приложения")
+    parser.add_argument("db", help="база, заполненная generate_data.py")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--orders", type=int, default=100, help="заказов в замере оформления и отмены")
+    parser.add_argument("--only", default="", help="замерять только операции, содержащие эту строку")
+    parser.add_argument("--profile", action="store_true", help="вывести сводку profiler по запросам")
+    args = parser.parse_args()
+
+    if args.profile:
+        profiler.enable()
+    services.open_database(args.db)
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'операция':40} {'медиана, мс':>12} {'мин, мс':>10}")
+        for name, func in cases(directory, args.orders):
+            if args.only not in name:
+                continue
+            median, best = measure(func, args.repeat)
+            print(f"{name:40} {median * 1000:12.1f} {best * 1000:10.1f}")
+
+    if args.profile:
+        print()
+        print(profiler.summary())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
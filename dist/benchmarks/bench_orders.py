@@ -0,0 +1,127 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import migrations
+import orders
+
+
+def prepare(path, products, stock, users):
+    migrations.migrate(path)
+    connection = sqlite3.connect(path)
+    connection.executemany("INSERT INTO Пользователи (Логин, Пароль, Роль) VALUES (?, ?, ?)",
+                           [(f"terminal{i}", "bench!1", "Пользователь") for i in range(users)])
+    connection.executemany("INSERT INTO Товары (Наименование, Вес, Стоимость, Количество) VALUES (?, ?, ?, ?)",
+                           [(f"Товар {i}", 100, 1000, stock) for i in range(products)])
+    connection.commit()
+    connection.close()
+
+
+# Прежняя логика make_order: остаток читается вне транзакции (как SELECT в sqlite3
+# по умолчанию), сравнивается в Python, затем списывается в отдельной транзакции.
+# Между чтением и записью другой терминал успевает списать тот же остаток.
+# race_delay (с) растягивает это окно, как время подтверждения заказа в прежнем окне,
+# чтобы перепродажа воспроизводилась при каждом запуске, а не от случая к случаю.
+def naive_place_order(user_id, cart, race_delay=0):
+    for product_id, quantity in cart:
+        available = db.fetch_one("SELECT Количество FROM Товары WHERE ID_товара = ?", (product_id,))[0]
+        if quantity > available:
+            raise orders.OutOfStock(product_id)
+    time.sleep(race_delay)
+    with db.transaction() as cursor:
+        for product_id, quantity in cart:
+            cursor.execute(
+                "INSERT INTO Заказы (ID_пользователя, ID_товара, Количество, Статус) VALUES (?, ?, ?, ?)",
+                (user_id, product_id, quantity, orders.NEW_ORDER_STATUS))
+            cursor.execute("UPDATE Товары SET Количество = Количество - ? WHERE ID_товара = ?",
+                           (quantity, product_id))
+
+
+def terminal(path, user_id, attempts, products, max_lines, naive, race_delay, seed, results):
+    db.configure(path, size=1)
+    if naive:
+        def place(user_id, cart):
+            naive_place_order(user_id, cart, race_delay)
+    else:
+        place = orders.place_order
+    generator = random.Random(seed)
+    placed = rejected = locked = 0
+    for _ in range(attempts):
+        cart = [(generator.randint(1, products), generator.randint(1, 3))
+                for _ in range(generator.randint(1, max_lines))]
+        try:
+            place(user_id, cart)
+            placed += 1
+        except orders.OutOfStock:
+            rejected += 1
+        except sqlite3.OperationalError:
+            locked += 1
+    results.put((placed, rejected, locked))
+
+
+def check_stock(path, products, stock):
+    connection = sqlite3.connect(path)
+    ordered = dict(connection.execute("SELECT ID_товара, SUM(Количество) FROM Заказы GROUP BY ID_товара"))
+    remaining = dict(connection.execute("SELECT ID_товара, Количество FROM Товары"))
+    connection.close()
+    oversold = 0
+    for product_id in range(1, products + 1):
+        sold = ordered.get(product_id, 0)
+        if remaining[product_id] < 0 or sold > stock or remaining[product_id] != stock - sold:
+            oversold += 1
+    return oversold
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест оформления заказов с нескольких процессов")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=500, help="попыток заказа на процесс")
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--stock", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=3, help="максимум строк в корзине")
+    parser.add_argument("--naive", action="store_true", help="прежняя проверка остатка в Python")
+    parser.add_argument("--race-delay", type=float, default=5,
+                        help="пауза между проверкой остатка и списанием в режиме --naive, мс")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "orders.db")
+        prepare(path, args.products, args.stock, args.processes)
+
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=terminal,
+                                           args=(path, n + 1, args.orders, args.products, args.lines,
+                                                 args.naive, args.race_delay / 1000, n, results))
+                   for n in range(args.processes)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        totals = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        placed = sum(result[0] for result in totals)
+        rejected = sum(result[1] for result in totals)
+        locked = sum(result[2] for result in totals)
+        oversold = check_stock(path, args.products, args.stock)
+
+    print(f"режим:              {f'прежний, пауза {args.race_delay:g} мс' if args.naive else 'orders.place_order'}")
+    print(f"процессов:          {args.processes}")
+    print(f"оформлено заказов:  {placed} ({placed / elapsed:.0f} заказов/с)")
+    print(f"отказ по остатку:   {rejected}")
+    print(f"ошибки блокировки:  {locked}")
+    print(f"товаров с перепродажей: {oversold}")
+    return 1 if oversold else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Каждый замер выполняется в новом процессе интерпретатора
+CASES = [
+    ("python без импортов", "pass"),
+    ("import services", "import services"),
+    ("import reports", "import reports"),
+    ("import cli", "import cli"),
+    ("import main (Qt, без окна)", "import main"),
+    ("pandas + openpyxl", "import pandas, openpyxl"),
+    ("services + pandas + openpyxl", "import services, pandas, openpyxl"),
+]
+
+
+def measure(code, runs):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def heavy_modules(code):
+    # Какие тяжёлые библиотеки оказались загружены после импорта
+    check = code + "; import sys; print(' '.join(m for m in ('pandas', 'openpyxl', 'PyQt6') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout.strip() or "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время запуска процесса и импорта модулей приложения")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    for name, code in CASES:
+        print(f"{name:32} {measure(code, args.runs) * 1000:8.1f} мс   загружены: {heavy_modules(code)}")
+
+    # Пакетный режим целиком: разбор аргументов без обращения к базе
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "cli.py", "--help"], cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+    print(f"{'cli.py --help':32} {(time.perf_counter() - started) * 1000:8.1f} мс")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
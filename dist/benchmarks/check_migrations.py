@@ -0,0 +1,90 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import migrations
+
+# Миграция базы со старой текстовой схемой, какую создавала прежняя версия приложения:
+#   python benchmarks/check_migrations.py
+
+# (наименование, Вес, Стоимость, ожидаемый вес в граммах, ожидаемая стоимость в копейках)
+LEGACY_PRODUCTS = [
+    ("Вентилятор", "3000", "2500.00", 3000, 250000),
+    ("Кресло", "", "7000.00", 0, 700000),
+    ("Рюкзак", " 2,5 ", "1089,5", 2.5, 108950),
+    ("Лампа", "1 500", "abc", 0, 0),
+    ("Принтер", "inf", "35000", 0, 3500000),
+]
+
+
+def legacy_database(path):
+    connection = sqlite3.connect(path)
+    migrations.create_tables(connection)
+    connection.executemany("INSERT INTO Товары (Наименование, Вес, Стоимость, Количество) VALUES (?, ?, ?, 1)",
+                           [product[:3] for product in LEGACY_PRODUCTS])
+    connection.execute("INSERT INTO ИсторияИзменений (Описание) VALUES ('Добавлен товар: Вентилятор в количестве 1')")
+    connection.commit()
+    connection.close()
+
+
+def check_legacy(directory):
+    path = os.path.join(directory, "legacy.db")
+    legacy_database(path)
+    warnings = migrations.migrate(path)
+    connection = sqlite3.connect(path)
+    problems = []
+    if migrations.schema_version(connection) != len(migrations.MIGRATIONS):
+        problems.append(f"user_version {migrations.schema_version(connection)}")
+    rows = connection.execute("SELECT Наименование, Вес, Стоимость FROM Товары ORDER BY ID_товара").fetchall()
+    expected = [(name, weight, price) for name, _, _, weight, price in LEGACY_PRODUCTS]
+    if rows != expected:
+        problems.append(f"товары {rows}")
+    invalid = "ID 2, 4, 5 "
+    if len(warnings) != 1 or invalid not in warnings[0]:
+        problems.append(f"предупреждения {warnings}")
+    recorded = connection.execute("SELECT COUNT(*) FROM ИсторияИзменений WHERE Описание LIKE ?",
+                                  (f"%{invalid}%",)).fetchone()[0]
+    if recorded != 1:
+        problems.append("ID товаров не записаны в историю")
+    connection.close()
+    return problems
+
+
+def check_shipped(directory):
+    # База, которая поставляется вместе с приложением, мигрирует без предупреждений
+    source = os.path.join(ROOT, "warehouse.db")
+    if not os.path.exists(source):
+        return []
+    path = os.path.join(directory, "warehouse.db")
+    shutil.copy(source, path)
+    warnings = migrations.migrate(path)
+    connection = sqlite3.connect(path)
+    version = migrations.schema_version(connection)
+    connection.close()
+    problems = [f"user_version {version}"] if version != len(migrations.MIGRATIONS) else []
+    return problems + [f"предупреждение: {warning}" for warning in warnings]
+
+
+CHECKS = [
+    ("Старая текстовая схема", check_legacy),
+    ("warehouse.db", check_shipped),
+]
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for name, check in CHECKS:
+            problems = check(directory)
+            failures += bool(problems)
+            print(f"{'FAIL' if problems else 'ok  '} {name}{': ' + '; '.join(problems) if problems else ''}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
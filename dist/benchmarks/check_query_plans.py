@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import migrations
+import reports
+import tables
+
+def history_page(entity=None, text=""):
+    # Следующая страница истории после строки с ID 1000
+    model = tables.changes_model()
+    model.where, model.params = ("Объект = ?", (entity,)) if entity else ("", ())
+    model.filter_text = text
+    model._last = (1000, 1000)
+    return model
+
+
+def searched(factory, text):
+    model = factory()
+    model.filter_text = text
+    return model
+
+
+# (описание, запрос или фабрика модели таблицы, параметры, таблица, которая не должна читаться полным сканированием)
+CHECKS = [
+    ("Мои заказы", lambda: tables.user_orders_model(1), None, "Заказы"),
+    ("Чек пользователя", reports.RECEIPT_QUERY, (1,), "Заказы"),
+    ("Пользователи с заказами в чеке", "SELECT EXISTS (SELECT 1 FROM Заказы WHERE ID_пользователя = ?)", (1,),
+     "Заказы"),
+    ("Заказы товара", "SELECT COUNT(*) FROM Заказы WHERE ID_товара = ?", (1,), "Заказы"),
+    ("Возврат остатка при отмене заказа", "UPDATE Товары SET Количество = Количество + ? WHERE ID_товара = ?",
+     (1, 1), "Товары"),
+    ("Поиск товара по наименованию", "SELECT ID_товара, Стоимость FROM Товары WHERE Наименование = ?", ("Товар",),
+     "Товары"),
+    ("Страница истории", history_page, None, "ИсторияИзменений"),
+    ("История по типу объекта", lambda: history_page("Товар"), None, "ИсторияИзменений"),
+    ("Поиск по истории", lambda: history_page(text="товар"), None, "ИсторияИзменений"),
+    ("Поиск товара", lambda: searched(tables.products_model, "болт"), None, "Товары"),
+    ("Поиск в заказах", lambda: searched(tables.orders_model, "болт"), None, "Заказы"),
+]
+
+
+def query_plan(connection, sql, params):
+    return [row[-1] for row in connection.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def full_scans(plan, table):
+    return [step for step in plan if step.split(" ")[:2] == ["SCAN", table] and "USING" not in step]
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "plans.db")
+        migrations.migrate(path)
+        db.configure(path)
+        with db.connection() as connection:
+            for name, sql, params, table in CHECKS:
+                if callable(sql):
+                    sql, params = sql()._page_query()
+                plan = query_plan(connection, sql, params)
+                scans = full_scans(plan, table)
+                failures += bool(scans)
+                print(f"{'FAIL' if scans else 'ok  '} {name}: {'; '.join(plan)}")
+        db.get_pool().close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import argparse
+import datetime
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import history
+import migrations
+import services
+
+BATCH_SIZE = 50000
+PRODUCT_NAMES = ["Болт", "Гайка", "Шайба", "Саморез", "Дюбель", "Кабель", "Труба", "Уголок", "Лист", "Краска"]
+
+
+def batches(rows, size=BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert(connection, name, sql, rows, count):
+    started = time.perf_counter()
+    done = 0
+    for batch in batches(rows):
+        connection.execute("BEGIN")
+        connection.executemany(sql, batch)
+        connection.execute("COMMIT")
+        done += len(batch)
+        print(f"\r{name}: {done}/{count}", end="", flush=True)
+    if count:
+        print(f"\r{name}: {done} строк за {time.perf_counter() - started:.1f} с")
+
+
+def max_id(connection, table, key):
+    return connection.execute(f"SELECT IFNULL(MAX({key}), 0) FROM {table}").fetchone()[0]
+
+
+def history_row(generator, user_ids, product_ids):
+    time_point = datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=generator.randint(0, 3 * 365 * 86400))
+    actor = f"user{generator.randint(*user_ids)}"
+    entity = generator.choice(history.ENTITIES)
+    if entity == "Товар":
+        entity_id = generator.randint(*product_ids)
+        action, description = generator.choice([("Добавление", f"Добавлен товар: Товар {entity_id}"),
+                                                ("Изменение", f"Изменен товар с ID {entity_id}")])
+    elif entity == "Заказ":
+        entity_id = generator.randint(1, 10 ** 6)
+        action, description = generator.choice([("Оформление", f"Оформлен заказ {entity_id}"),
+                                                ("Отмена", f"Отменён заказ {entity_id}"),
+                                                ("Смена статуса", f"Статус заказа {entity_id} изменён")])
+    else:
+        entity_id = generator.randint(*user_ids)
+        action, description = "Смена роли", f"Роль пользователя user{entity_id} изменена"
+    return time_point.isoformat(sep=" "), actor, entity, entity_id, action, description
+
+
+def generate(path, users, products, orders_count, history_count, seed):
+    migrations.migrate(path)
+    generator = random.Random(seed)
+    connection = sqlite3.connect(path, isolation_level=None)
+    # Генерация данных не требует надёжности записи: при сбое файл создаётся заново
+    connection.execute("PRAGMA synchronous = OFF")
+
+    first_user = max_id(connection, "Пользователи", "ID_пользователя") + 1
+    insert(connection, "Пользователи", "INSERT INTO Пользователи (ID_пользователя, Логин, Пароль, Роль) VALUES (?, ?, ?, ?)",
+           ((first_user + n, f"user{first_user + n}", "bench!1",
+             "Сотрудник" if n % 50 == 0 else "Пользователь") for n in range(users)), users)
+
+    first_product = max_id(connection, "Товары", "ID_товара") + 1
+    insert(connection, "Товары", "INSERT INTO Товары (ID_товара, Наименование, Вес, Стоимость, Количество) "
+                                 "VALUES (?, ?, ?, ?, ?)",
+           ((first_product + n, f"{generator.choice(PRODUCT_NAMES)} {first_product + n}",
+             round(generator.uniform(1, 5000), 1), generator.randint(100, 500000), generator.randint(0, 10000))
+            for n in range(products)), products)
+
+    user_ids = (1, max_id(connection, "Пользователи", "ID_пользователя"))
+    product_ids = (1, max_id(connection, "Товары", "ID_товара"))
+    if orders_count and user_ids[1] and product_ids[1]:
+        insert(connection, "Заказы", "INSERT INTO Заказы (ID_пользователя, ID_товара, Количество, Статус) "
+                                     "VALUES (?, ?, ?, ?)",
+               ((generator.randint(*user_ids), generator.randint(*product_ids), generator.randint(1, 10),
+                 generator.choice(services.ORDER_STATUSES)) for _ in range(orders_count)), orders_count)
+
+    insert(connection, "ИсторияИзменений", "INSERT INTO ИсторияИзменений (Время, Пользователь, Объект, ID_объекта, "
+                                           "Действие, Описание) VALUES (?, ?, ?, ?, ?, ?)",
+           (history_row(generator, user_ids, product_ids) for _ in range(history_count)), history_count)
+
+    connection.execute("ANALYZE")
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заполнение базы склада синтетическими данными")
+    parser.add_argument("db", help="файл базы данных (создаётся или дополняется)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--history", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generate(args.db, args.users, args.products, args.orders, args.history, args.seed)
+    print(f"готово за {time.perf_counter() - started:.1f} с: {args.db}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
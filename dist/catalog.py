@@ -0,0 +1,126 @@
+import threading
+from collections import namedtuple
+
+import db
+
+Product = namedtuple("Product", ["id", "name", "weight", "price", "quantity"])
+
+
+class ProductCatalog:
+    # Копия таблицы Товары в памяти процесса с индексом по ID.
+    # PRAGMA data_version меняется, когда любое другое соединение (в том числе
+    # другой процесс) фиксирует запись в файл, и не требует чтения с диска.
+    # Если она изменилась, сверяется счётчик Товары в ВерсииТаблиц, который
+    # ведут триггеры: записи в Заказы и историю каталог не перечитывают.
+    # Счётчик не растёт при списании остатков, поэтому остатки дочитываются
+    # отдельно: get() читает одну строку, products() только столбец Количество.
+    def __init__(self, path=None):
+        self.path = path or db.DB_PATH
+        self._lock = threading.Lock()
+        self._connection = None
+        self._data_version = None
+        self._table_version = None
+        self._quantities_version = None
+        self.version = None
+        self._products = []
+        self._by_id = {}
+
+    def _current_version(self):
+        if self._connection is None:
+            self._connection = db.open_connection(self.path)
+        data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._table_version = self._connection.execute(
+                "SELECT Версия FROM ВерсииТаблиц WHERE Таблица = 'Товары'").fetchone()[0]
+        return self._table_version
+
+    def _sync(self):
+        if self._current_version() == self.version:
+            return
+        data_version = self._data_version
+        # Чтение и счётчика, и строк в одной транзакции даёт согласованный снимок
+        self._connection.execute("BEGIN")
+        try:
+            version = self._connection.execute(
+                "SELECT Версия FROM ВерсииТаблиц WHERE Таблица = 'Товары'").fetchone()[0]
+            products = [Product(*row) for row in self._connection.execute(
+                "SELECT ID_товара, Наименование, Вес, Стоимость, Количество FROM Товары ORDER BY ID_товара")]
+        finally:
+            self._connection.rollback()
+        self._set_products(products)
+        self.version = version
+        self._quantities_version = data_version
+
+    def _sync_quantities(self):
+        self._sync()
+        if self._quantities_version == self._data_version:
+            return
+        data_version = self._data_version
+        quantities = dict(self._connection.execute("SELECT ID_товара, Количество FROM Товары"))
+        self._set_products([product._replace(quantity=quantities.get(product.id, product.quantity))
+                            for product in self._products])
+        self._quantities_version = data_version
+
+    def _set_products(self, products):
+        self._products = products
+        self._by_id = {product.id: product for product in products}
+
+    def current_version(self):
+        # Только проверка актуальности, без перечитывания товаров
+        with self._lock:
+            return self._current_version()
+
+    def products(self):
+        with self._lock:
+            self._sync_quantities()
+            return self._products
+
+    def count(self):
+        with self._lock:
+            self._sync()
+            return len(self._products)
+
+    def get(self, product_id):
+        with self._lock:
+            self._sync()
+            product = self._by_id.get(product_id)
+            if product is None or self._quantities_version == self._data_version:
+                return product
+            row = self._connection.execute("SELECT Количество FROM Товары WHERE ID_товара = ?",
+                                           (product_id,)).fetchone()
+            return product._replace(quantity=row[0]) if row else None
+
+    def prices(self):
+        with self._lock:
+            self._sync()
+            return {product.id: product.price for product in self._products}
+
+    def names(self):
+        with self._lock:
+            self._sync()
+            return {product.id: product.name for product in self._products}
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self._data_version = None
+            self._table_version = None
+            self._quantities_version = None
+            self.version = None
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None or _catalog.path != db.DB_PATH:
+            if _catalog is not None:
+                _catalog.close()
+            _catalog = ProductCatalog()
+        return _catalog
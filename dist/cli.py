@@ -0,0 +1,98 @@
+import argparse
+import datetime
+import os
+import sys
+
+import db
+import reports
+import services
+
+# Пакетный режим без графического интерфейса, например для ночных отчётов по cron:
+#   python cli.py --db /srv/warehouse.db nightly --output-dir /srv/reports
+
+
+def print_progress(done, total):
+    if total:
+        print(f"\r  {done}/{total}", end="", file=sys.stderr, flush=True)
+
+
+def write_report(name, writer, file_path, quiet):
+    total_sum = writer(file_path, None if quiet else print_progress)
+    if not quiet:
+        print(file=sys.stderr)
+    print(f"{name}: {file_path} (итого {total_sum:.2f} руб.)")
+
+
+def stock(args):
+    if not reports.has_products():
+        print("На складе нет товаров. Отчёт не создан.", file=sys.stderr)
+        return 1
+    write_report("Склад", reports.write_stock_report, args.output, args.quiet)
+    return 0
+
+
+def orders_report(args):
+    if not reports.has_orders():
+        print("Нет заказов для отчёта.", file=sys.stderr)
+        return 1
+    write_report("Заказы", reports.write_orders_report, args.output, args.quiet)
+    return 0
+
+
+def receipt(args):
+    user_id = services.get_user_id(args.login)
+    if user_id is None or not reports.has_user_orders(user_id):
+        print(f"У пользователя {args.login} нет заказов.", file=sys.stderr)
+        return 1
+    write_report("Чек", lambda file_path, progress: reports.write_receipt(user_id, file_path, progress),
+                 args.output, args.quiet)
+    return 0
+
+
+def nightly(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    date = args.date or datetime.date.today().isoformat()
+    if reports.has_products():
+        write_report("Склад", reports.write_stock_report,
+                     os.path.join(args.output_dir, f"Склад_товаров_{date}.xlsx"), args.quiet)
+    if reports.has_orders():
+        write_report("Заказы", reports.write_orders_report,
+                     os.path.join(args.output_dir, f"заказы_{date}.xlsx"), args.quiet)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Отчёты склада без графического интерфейса")
+    parser.add_argument("--db", default=None, help=f"файл базы данных (по умолчанию {db.DB_PATH})")
+    parser.add_argument("--quiet", action="store_true", help="не выводить прогресс")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("stock", help="отчёт о состоянии склада")
+    command.add_argument("output")
+    command.set_defaults(func=stock)
+
+    command = commands.add_parser("orders", help="отчёт по заказам")
+    command.add_argument("output")
+    command.set_defaults(func=orders_report)
+
+    command = commands.add_parser("receipt", help="чек пользователя")
+    command.add_argument("login")
+    command.add_argument("output")
+    command.set_defaults(func=receipt)
+
+    command = commands.add_parser("nightly", help="отчёты о складе и заказах в каталог")
+    command.add_argument("--output-dir", default="reports")
+    command.add_argument("--date", default=None, help="дата в имени файла (по умолчанию сегодня)")
+    command.set_defaults(func=nightly)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    for warning in services.open_database(args.db):
+        print(warning, file=sys.stderr)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import profiler
+import units
+
+DB_PATH = os.environ.get("WAREHOUSE_DB", "warehouse.db")
+POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+CACHED_STATEMENTS = 256
+
+
+def casefold(value):
+    # LIKE в SQLite не учитывает регистр только для латиницы
+    return None if value is None else str(value).casefold()
+
+
+# Функции Python, доступные в запросах: фильтр таблиц сравнивает текст в том виде,
+# в каком он показан пользователю
+SQL_FUNCTIONS = {
+    "casefold": casefold,
+    "format_price": units.format_price,
+    "format_weight": units.format_weight,
+}
+
+
+def open_connection(path=None):
+    # isolation_level=None: транзакции открываются явно через transaction()
+    connection = sqlite3.connect(path or DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000,
+                                 isolation_level=None, check_same_thread=False,
+                                 cached_statements=CACHED_STATEMENTS,
+                                 factory=profiler.connection_class())
+    for name, func in SQL_FUNCTIONS.items():
+        connection.create_function(name, 1, func, deterministic=True)
+    connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    connection.execute("PRAGMA journal_mode = WAL")
+    # FULL: каждый COMMIT (в том числе оформленный заказ) сохраняется на диск до возврата,
+    # при NORMAL последние транзакции могут пропасть при отключении питания
+    connection.execute("PRAGMA synchronous = FULL")
+    # foreign_keys не включается: в базе есть заказы удалённых пользователей и товаров,
+    # и с проверкой ключей их удаление (как в исходной версии) стало бы невозможным
+    return connection
+
+
+class ConnectionPool:
+    def __init__(self, path=None, size=POOL_SIZE):
+        self.path = path or DB_PATH
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._threads = {}
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return open_connection(self.path)
+        return self._idle.get()
+
+    def _release(self, connection):
+        if connection.in_transaction:
+            connection.rollback()
+        self._idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        # Вложенные вызовы в одном потоке получают то же соединение,
+        # чтобы record_change и т.п. попадали в уже открытую транзакцию
+        held = getattr(self._local, "connection", None)
+        if held is not None:
+            yield held
+            return
+        connection = self._acquire()
+        self._local.connection = connection
+        try:
+            yield connection
+        finally:
+            self._local.connection = None
+            self._release(connection)
+
+    def thread_connection(self):
+        # Соединение привязано к потоку ОС, а не к threading.local: потоки QThreadPool
+        # теряют состояние Python между задачами, и соединение открывалось бы заново для каждой
+        ident = threading.get_ident()
+        connection = self._threads.get(ident)
+        if connection is None:
+            connection = open_connection(self.path)
+            with self._lock:
+                self._threads[ident] = connection
+        return connection
+
+    def close_thread_connections(self):
+        with self._lock:
+            connections = list(self._threads.values())
+            self._threads.clear()
+        for connection in connections:
+            connection.close()
+
+    @contextmanager
+    def use_thread_connection(self):
+        # Рабочие потоки держат собственное соединение вне общего пула,
+        # чтобы долгие отчёты не занимали соединения интерфейса
+        previous = getattr(self._local, "connection", None)
+        self._local.connection = self.thread_connection()
+        try:
+            yield self._local.connection
+        finally:
+            if self._local.connection.in_transaction:
+                self._local.connection.rollback()
+            self._local.connection = previous
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        with self.connection() as connection:
+            if connection.in_transaction:
+                yield connection
+                return
+            connection.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield connection
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+        self.close_thread_connections()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def configure(path, size=POOL_SIZE):
+    global _pool, DB_PATH
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        DB_PATH = path
+        _pool = ConnectionPool(path, size)
+    return _pool
+
+
+def connection():
+    return get_pool().connection()
+
+
+def transaction(immediate=False):
+    return get_pool().transaction(immediate)
+
+
+def fetch_all(sql, params=()):
+    with connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def fetch_one(sql, params=()):
+    with connection() as conn:
+        return conn.execute(sql, params).fetchone()
+
+
+def execute(sql, params=()):
+    with transaction() as conn:
+        return conn.execute(sql, params).rowcount
+
+
+def execute_many(sql, seq_of_params):
+    with transaction() as conn:
+        return conn.executemany(sql, seq_of_params).rowcount
+
+
+def has_table(name):
+    # Полнотекстовые индексы создаются миграциями, только если SQLite собран с FTS5
+    return fetch_one("SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE name = ?)", (name,))[0] == 1
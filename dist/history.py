@@ -0,0 +1,12 @@
+import db
+
+FTS_TABLE = "ИсторияИзменений_fts"
+ENTITIES = ["Товар", "Заказ", "Пользователь"]
+
+
+def record(description, actor=None, entity=None, entity_id=None, action=None):
+    # Вызывается внутри транзакции изменения (db.transaction() или транзакции orders.py):
+    # запись истории фиксируется или откатывается вместе с самим изменением
+    db.execute("INSERT INTO ИсторияИзменений (Время, Пользователь, Объект, ID_объекта, Действие, Описание) "
+               "VALUES (datetime('now', 'localtime'), ?, ?, ?, ?, ?)",
+               (actor, entity, entity_id, action, description))
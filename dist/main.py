@@ -1,132 +1,27 @@
 import sys
-import re
 import os
 import sqlite3
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget,
                              QPushButton, QLineEdit, QLabel, QMessageBox,
-                             QTableWidget, QTableWidgetItem, QFileDialog, QFormLayout, QDialog, QComboBox, QCheckBox)
+                             QFileDialog, QFormLayout, QDialog, QComboBox, QCheckBox, QProgressDialog,
+                             QListWidget)
 from PyQt6.QtCore import Qt
-import pandas as pd
 
-
-def connect_db():
-    connection = sqlite3.connect("warehouse.db")
-    cursor = connection.cursor()
-    return connection, cursor
-
-
-def create_tables():
-    connection, cursor = connect_db()
-
-    cursor.execute('''CREATE TABLE IF NOT EXISTS Пользователи (
-                        ID_пользователя INTEGER PRIMARY KEY,
-                        Логин TEXT UNIQUE NOT NULL,
-                        Пароль TEXT NOT NULL,
-                        Роль TEXT NOT NULL
-                     )''')
-
-    cursor.execute('''CREATE TABLE IF NOT EXISTS Товары (
-                        ID_товара INTEGER PRIMARY KEY,
-                        Наименование TEXT NOT NULL,
-                        Вес TEXT NOT NULL,
-                        Стоимость TEXT NOT NULL,
-                        Количество INTEGER DEFAULT 0  -- Добавлено поле Количество
-                     )''')
-
-    cursor.execute('''CREATE TABLE IF NOT EXISTS Заказы (
-                        ID_заказа INTEGER PRIMARY KEY,
-                        ID_пользователя INTEGER,
-                        ID_товара INTEGER,
-                        Количество INTEGER,
-                        Статус TEXT NOT NULL,
-                        FOREIGN KEY(ID_пользователя) REFERENCES Пользователи(ID_пользователя),
-                        FOREIGN KEY(ID_товара) REFERENCES Товары(ID_товара)
-                     )''')
-
-    cursor.execute('''CREATE TABLE IF NOT EXISTS ИсторияИзменений (
-                        ID INTEGER PRIMARY KEY,
-                        Описание TEXT NOT NULL
-                     )''')
-
-    connection.commit()
-    connection.close()
-
-
-create_tables()
-
-
-def validate_password(password):
-    return len(password) >= 6 and re.search(r"[!?:_\-+]", password)
+import history
+import reports
+import services
+import tables
+import units
+import workers
 
 
 def add_user_to_db(login, password, role="Пользователь"):
-    if not validate_password(password):
-        QMessageBox.warning(None, "Ошибка",
-                            "Пароль должен быть не менее 6 символов и содержать хотя бы один специальный символ (!, ?, :, _, -, +)")
-        return False
-
-    connection, cursor = connect_db()
     try:
-        cursor.execute("INSERT INTO Пользователи (Логин, Пароль, Роль) VALUES (?, ?, ?)", (login, password, role))
-        connection.commit()
+        services.register_user(login, password, role)
         return True
-    except sqlite3.IntegrityError:
-        QMessageBox.warning(None, "Ошибка", "Логин уже существует!")
+    except ValueError as e:
+        QMessageBox.warning(None, "Ошибка", str(e))
         return False
-    finally:
-        connection.close()
-
-
-def authenticate_user(login, password):
-    if login == "admin" and password == "admin":
-        return "Администратор"
-
-    connection, cursor = connect_db()
-    cursor.execute("SELECT Роль FROM Пользователи WHERE Логин = ? AND Пароль = ?", (login, password))
-    result = cursor.fetchone()
-    connection.close()
-    return result[0] if result else None
-
-
-def get_all_products():
-    connection, cursor = connect_db()
-    cursor.execute("SELECT * FROM Товары")
-    products = cursor.fetchall()
-    connection.close()
-    return products if products else []
-
-
-def get_all_orders():
-    connection, cursor = connect_db()
-    cursor.execute(
-        "SELECT Заказы.ID_заказа, Пользователи.Логин, Товары.Наименование, Заказы.Количество, Заказы.Статус FROM Заказы "
-        "JOIN Пользователи ON Заказы.ID_пользователя = Пользователи.ID_пользователя "
-        "JOIN Товары ON Заказы.ID_товара = Товары.ID_товара")
-    orders = cursor.fetchall()
-    connection.close()
-    return orders
-
-
-def get_all_users():
-    connection, cursor = connect_db()
-    cursor.execute("SELECT ID_пользователя, Логин, Роль FROM Пользователи")
-    users = cursor.fetchall()
-    connection.close()
-    return users if users else []
-
-
-def update_user_role(user_id, new_role):
-    connection, cursor = connect_db()
-    cursor.execute("UPDATE Пользователи SET Роль = ? WHERE ID_пользователя = ?", (new_role, user_id))
-    connection.commit()
-    connection.close()
-
-
-def record_change(description):
-    connection, cursor = connect_db()
-    cursor.execute("INSERT INTO ИсторияИзменений (Описание) VALUES (?)", (description,))
-    connection.commit()
-    connection.close()
 
 
 class RegistrationWindow(QDialog):
@@ -186,7 +81,7 @@ class LoginWindow(QMainWindow):
     def handle_login(self):
         login = self.login_field.text()
         password = self.password_field.text()
-        role = authenticate_user(login, password)
+        role = services.authenticate_user(login, password)
         if role:
             QMessageBox.information(self, "Успех", f"Вход выполнен. Роль: {role}")
             self.main_window = MainWindow(role, login)
@@ -207,35 +102,19 @@ class MainWindow(QMainWindow):
         self.setGeometry(560, 240, 800, 600)
         self.username = username
         self.user_id = None
+        self.products_version = None
 
-        connection, cursor = connect_db()
-        cursor.execute("SELECT ID_пользователя FROM Пользователи WHERE Логин = ?", (username,))
-        user = cursor.fetchone()
-        if user:
-            self.user_id = user[0]
-        connection.close()
+        self.user_id = services.get_user_id(username)
 
         self.buttons_layout = QVBoxLayout()
 
+        self.product_table = tables.SqlTableView()
         if role == "Администратор":
-            self.product_table = QTableWidget()
-            self.product_table.setColumnCount(4)
-            self.product_table.setHorizontalHeaderLabels(["ID", "Наименование", "Вес", "Стоимость"])
             self.load_products(hide_id=False)
-            self.load_products()
         elif role == "Сотрудник":
-            self.product_table = QTableWidget()
-            self.product_table.setColumnCount(5)
-            self.product_table.setHorizontalHeaderLabels(["ID заказа", "Пользователь", "Товар", "Количество", "Статус"])
             self.load_orders()
         elif role == "Пользователь":
-            self.product_table = QTableWidget()
-            self.product_table.setColumnCount(4)
-            self.product_table.setHorizontalHeaderLabels(["Наименование", "Вес", "Стоимость"])
-            if role == "Пользователь":
-                self.load_products(hide_id=True)
-            else:
-                self.load_products(hide_id=False)
+            self.load_products(hide_id=True)
 
         self.setup_buttons(role)
 
@@ -302,35 +181,27 @@ class MainWindow(QMainWindow):
         self.logout_button.clicked.connect(self.logout)
         self.buttons_layout.addWidget(self.logout_button)
 
-    def load_products(self, hide_id=False):
-        products = get_all_products()
-        self.product_table.setColumnCount(5 if not hide_id else 4)
-        headers = ["ID", "Наименование", "Вес, гр", "Стоимость, руб", "Количество, шт"] if not hide_id else ["Наименование", "Вес, гр", "Стоимость, руб", "Количество, шт"]
-        self.product_table.setHorizontalHeaderLabels(headers)
-        self.product_table.setRowCount(len(products))
-
-        for row, product in enumerate(products):
-            for column, item in enumerate(product):
-                if hide_id and column == 0:
-                    continue
-                display_column = column if not hide_id else column - 1
-                self.product_table.setItem(row, display_column, QTableWidgetItem(str(item)))
+    def load_products(self, hide_id=False, force=False):
+        # Таблица перечитывается, только если товары менялись с прошлой загрузки;
+        # force — после изменения остатков, которое версию каталога не меняет
+        version = services.products_version()
+        if self.product_table.model() is None:
+            self.product_table.set_model(tables.products_model(hide_id=hide_id, parent=self))
+        elif force or version != self.products_version:
+            self.product_table.refresh()
+        self.products_version = version
 
     def load_orders(self):
-        orders = get_all_orders()
-        self.product_table.setRowCount(len(orders))
-        self.product_table.setColumnCount(5)
-        self.product_table.setHorizontalHeaderLabels(["ID заказа", "Пользователь", "Товар", "Количество, шт", "Статус"])
-
-        for row, order in enumerate(orders):
-            for column, item in enumerate(order):
-                self.product_table.setItem(row, column, QTableWidgetItem(str(item)))
+        if self.product_table.model() is not None:
+            self.product_table.refresh()
+            return
+        self.product_table.set_model(tables.orders_model(parent=self))
 
     def manage_users(self):
         dialog = QDialog(self)
         dialog.setWindowTitle("Управление пользователями")
         layout = QVBoxLayout()
-        users = get_all_users()
+        users = services.get_all_users()
         self.user_checkboxes = []
         self.user_roles = {}
         for user in users:
@@ -339,7 +210,7 @@ class MainWindow(QMainWindow):
             self.user_checkboxes.append(checkbox)
             layout.addWidget(checkbox)
             role_combo = QComboBox()
-            role_combo.addItems(["Пользователь", "Сотрудник", "Администратор"])
+            role_combo.addItems(services.ROLES)
             role_combo.setCurrentText(user[2])
             self.user_roles[user[0]] = role_combo
             layout.addWidget(role_combo)
@@ -348,21 +219,14 @@ class MainWindow(QMainWindow):
 
         def handle_delete():
             to_delete = [cb.user_id for cb in self.user_checkboxes if cb.isChecked()]
-            connection, cursor = connect_db()
-            cursor.executemany("DELETE FROM Пользователи WHERE ID_пользователя = ?",
-                               [(user_id,) for user_id in to_delete])
-            connection.commit()
-            connection.close()
+            services.delete_users(to_delete, actor=self.username)
             QMessageBox.information(self, "Успех", "Пользователи удалены")
             dialog.accept()
 
         def handle_update_roles():
-            connection, cursor = connect_db()
-            for user_id, role_combo in self.user_roles.items():
-                new_role = role_combo.currentText()
-                cursor.execute("UPDATE Пользователи SET Роль = ? WHERE ID_пользователя = ?", (new_role, user_id))
-            connection.commit()
-            connection.close()
+            services.update_user_roles({user_id: role_combo.currentText()
+                                        for user_id, role_combo in self.user_roles.items()},
+                                       actor=self.username)
             QMessageBox.information(self, "Успех", "Роли обновлены")
             dialog.accept()
 
@@ -374,10 +238,7 @@ class MainWindow(QMainWindow):
         dialog.exec()
 
     def delete_product(self):
-        connection, cursor = connect_db()
-        cursor.execute("SELECT ID_товара, Наименование FROM Товары")
-        products = cursor.fetchall()
-        connection.close()
+        products = [(product.id, product.name) for product in services.get_all_products()]
 
         if not products:
             QMessageBox.information(self, "Информация", "На складе нет товаров для удаления.")
@@ -411,17 +272,13 @@ class MainWindow(QMainWindow):
             )
 
             if confirmation == QMessageBox.StandardButton.Yes:
-                connection, cursor = connect_db()
                 try:
-                    cursor.execute("DELETE FROM Товары WHERE ID_товара = ?", (selected_product_id,))
-                    connection.commit()
+                    services.delete_product(selected_product_id, actor=self.username)
                     QMessageBox.information(self, "Успех", "Товар успешно удалён.")
                     self.load_products(hide_id=False)
                     dialog.accept()
                 except sqlite3.Error as e:
                     QMessageBox.warning(self, "Ошибка", f"Ошибка базы данных: {e}")
-                finally:
-                    connection.close()
 
         layout.addWidget(product_combo)
         layout.addWidget(delete_button)
@@ -442,23 +299,20 @@ class MainWindow(QMainWindow):
 
         def handle_submit():
             name = name_input.text()
-            weight = weight_input.text()
             try:
-                price = f"{float(price_input.text()):.2f}"
+                price = units.parse_price(price_input.text())
             except ValueError:
                 QMessageBox.warning(self, "Ошибка", "Введите корректную цену в формате '100.00'")
                 return
+            try:
+                weight = units.parse_weight(weight_input.text())
+            except ValueError:
+                QMessageBox.warning(self, "Ошибка", "Введите корректный вес в граммах")
+                return
             quantity = quantity_input.text()
 
-            if name and weight and price and quantity.isdigit():
-                connection, cursor = connect_db()
-                cursor.execute(
-                    "INSERT INTO Товары (Наименование, Вес, Стоимость, Количество) VALUES (?, ?, ?, ?)",
-                    (name, weight, price, int(quantity))
-                )
-                connection.commit()
-                connection.close()
-                record_change(f"Добавлен товар: {name} в количестве {quantity}")
+            if name and quantity.isdigit():
+                services.add_product(name, weight, price, int(quantity), actor=self.username)
                 QMessageBox.information(self, "Успех", "Товар добавлен")
                 self.load_products()
                 dialog.accept()
@@ -488,24 +342,22 @@ class MainWindow(QMainWindow):
 
         def handle_submit():
             product_id = product_id_input.text()
-            name = name_input.text()
-            weight = weight_input.text()
+            name = name_input.text() or None
             try:
-                price = f"{float(price_input.text()):.2f}" if price_input.text() else None
+                price = units.parse_price(price_input.text()) if price_input.text() else None
             except ValueError:
                 QMessageBox.warning(self, "Ошибка", "Введите корректную цену в формате '100.00'")
                 return
-            quantity = quantity_input.text()
+            try:
+                weight = units.parse_weight(weight_input.text()) if weight_input.text() else None
+            except ValueError:
+                QMessageBox.warning(self, "Ошибка", "Введите корректный вес в граммах")
+                return
+            quantity = int(quantity_input.text()) if quantity_input.text().isdigit() else None
 
-            if product_id and (name or weight or price or quantity.isdigit()):
-                connection, cursor = connect_db()
-                cursor.execute(
-                    "UPDATE Товары SET Наименование = ?, Вес = ?, Стоимость = ?, Количество = ? WHERE ID_товара = ?",
-                    (name, weight, price, int(quantity), product_id)
-                )
-                connection.commit()
-                connection.close()
-                record_change(f"Изменен товар с ID {product_id}")
+            if product_id and (name or weight is not None or price is not None or quantity is not None):
+                # Пустые поля оставляют прежнее значение
+                services.update_product(product_id, name, weight, price, quantity, actor=self.username)
                 QMessageBox.information(self, "Успех", "Изменения сохранены")
                 self.load_products()
                 dialog.accept()
@@ -527,10 +379,10 @@ class MainWindow(QMainWindow):
         dialog.setWindowTitle("Обновить статус заказа")
         layout = QVBoxLayout()
 
-        orders = get_all_orders()
+        orders = services.get_all_orders()
         order_combo = QComboBox()
         status_combo = QComboBox()
-        status_combo.addItems(["Заказ принят", "Идет сбор заказа", "Готов к выдаче", "Выдан"])
+        status_combo.addItems(services.ORDER_STATUSES)
 
         for order in orders:
             order_combo.addItem(
@@ -547,10 +399,7 @@ class MainWindow(QMainWindow):
             selected_order_id = orders[selected_order_index][0]
             new_status = status_combo.currentText()
 
-            connection, cursor = connect_db()
-            cursor.execute("UPDATE Заказы SET Статус = ? WHERE ID_заказа = ?", (new_status, selected_order_id))
-            connection.commit()
-            connection.close()
+            services.update_order_status(selected_order_id, new_status, actor=self.username)
 
             QMessageBox.information(self, "Успех", "Статус заказа обновлён")
 
@@ -565,11 +414,7 @@ class MainWindow(QMainWindow):
         dialog.exec()
 
     def issue_receipt(self):
-        connection, cursor = connect_db()
-        cursor.execute("SELECT DISTINCT Пользователи.ID_пользователя, Пользователи.Логин FROM Заказы "
-                       "JOIN Пользователи ON Заказы.ID_пользователя = Пользователи.ID_пользователя")
-        users = cursor.fetchall()
-        connection.close()
+        users = services.get_users_with_orders()
 
         if not users:
             QMessageBox.information(self, "Информация", "Нет пользователей с заказами.")
@@ -595,26 +440,10 @@ class MainWindow(QMainWindow):
 
             selected_user_id = user_combo.itemData(selected_user_index)
 
-            connection, cursor = connect_db()
-            cursor.execute(
-                """SELECT Товары.Наименование, Заказы.Количество, Товары.Стоимость, 
-                          (Заказы.Количество * Товары.Стоимость) AS Сумма_товара
-                   FROM Заказы
-                   JOIN Товары ON Заказы.ID_товара = Товары.ID_товара
-                   WHERE Заказы.ID_пользователя = ?""",
-                (selected_user_id,)
-            )
-            orders = cursor.fetchall()
-            connection.close()
-
-            if not orders:
+            if not reports.has_user_orders(selected_user_id):
                 QMessageBox.information(dialog, "Информация", "У этого пользователя нет заказов.")
                 return
 
-            df_receipt = pd.DataFrame(orders,
-                                      columns=["Товар", "Количество, шт", "Цена за единицу, руб", "Сумма товара, руб"])
-            total_sum = df_receipt["Сумма товара, руб"].sum()
-
             file_path, _ = QFileDialog.getSaveFileName(
                 self,
                 "Сохранить чек",
@@ -626,18 +455,13 @@ class MainWindow(QMainWindow):
                 QMessageBox.information(dialog, "Отмена", "Сохранение чека отменено.")
                 return
 
-            try:
-                with pd.ExcelWriter(file_path, engine="openpyxl") as writer:
-                    df_receipt.to_excel(writer, sheet_name="Чек", index=False)
-
-                    workbook = writer.book
-                    worksheet = workbook["Чек"]
-                    worksheet.append(["Общая сумма заказа:", f"{total_sum:.2f} руб"])
-
+            def handle_saved(total_sum):
                 QMessageBox.information(dialog, "Успех", f"Чек успешно сохранён в: {file_path}")
                 dialog.accept()
-            except Exception as e:
-                QMessageBox.warning(dialog, "Ошибка", f"Ошибка при сохранении чека: {str(e)}")
+
+            self.run_task(lambda task: reports.write_receipt(selected_user_id, file_path, task.report_progress),
+                          handle_saved, "Ошибка при сохранении чека", parent=dialog,
+                          progress_label="Формирование чека...")
 
         layout.addWidget(user_combo)
         layout.addWidget(confirm_button)
@@ -646,14 +470,9 @@ class MainWindow(QMainWindow):
         dialog.exec()
 
     def view_orders(self):
-        orders = get_all_orders()
         dialog = QDialog(self)
         dialog.setWindowTitle("Список заказов")
-        table = QTableWidget(len(orders), 5)
-        table.setHorizontalHeaderLabels(["ID", "Пользователь", "Товар", "Количество, шт", "Статус"])
-        for row, order in enumerate(orders):
-            for column, item in enumerate(order):
-                table.setItem(row, column, QTableWidgetItem(str(item)))
+        table = tables.SqlTableView(tables.orders_model(parent=dialog))
         layout = QVBoxLayout()
         layout.addWidget(table)
         dialog.setLayout(layout)
@@ -666,83 +485,85 @@ class MainWindow(QMainWindow):
 
         layout = QFormLayout()
         product_combo = QComboBox()
-        products = get_all_products()
-        product_ids = {}
+        products = services.get_all_products()
 
         for product in products:
-            product_ids[product[1]] = product[0]
-            product_combo.addItem(f"{product[1]} ({product[2]} гр, {product[3]} руб)", product[0])
+            product_combo.addItem(f"{product[1]} ({units.format_weight(product[2])} гр, "
+                                  f"{units.format_price(product[3])} руб)", product[0])
 
         quantity_input = QLineEdit()
         quantity_input.setPlaceholderText("Введите количество")
 
+        cart = []
+        cart_list = QListWidget()
+        add_button = QPushButton("Добавить в корзину")
         submit_button = QPushButton("Оформить заказ")
 
-        def handle_submit():
-            product_index = product_combo.currentIndex()
-            product_id = product_combo.itemData(product_index)
+        def selected_line():
+            product_id = product_combo.itemData(product_combo.currentIndex())
             quantity = quantity_input.text()
 
             if not quantity.isdigit() or int(quantity) <= 0:
                 QMessageBox.warning(self, "Ошибка", "Количество товара должно быть больше 0!")
-                return
+                return None
 
-            if product_id and quantity.isdigit():
-                connection, cursor = connect_db()
+            if not product_id:
+                QMessageBox.warning(self, "Ошибка", "Введите корректное количество")
+                return None
 
-                cursor.execute("SELECT Количество FROM Товары WHERE ID_товара = ?", (product_id,))
-                available_quantity = cursor.fetchone()[0]
-                if int(quantity) > available_quantity:
-                    QMessageBox.warning(self, "Ошибка", "Недостаточно товара на складе!")
-                    return
+            # Предварительная проверка по кэшу каталога; окончательная выполняется при оформлении
+            product = services.get_product(product_id)
+            in_cart = sum(line_quantity for line_id, line_quantity in cart if line_id == product_id)
+            if product is not None and int(quantity) + in_cart > product.quantity:
+                QMessageBox.warning(self, "Ошибка", "Недостаточно товара на складе!")
+                return None
 
-                cursor.execute(
-                    "INSERT INTO Заказы (ID_пользователя, ID_товара, Количество, Статус) VALUES (?, ?, ?, ?)",
-                    (self.user_id, product_id, int(quantity), "Заказ принят"))
+            return product_id, int(quantity)
 
-                cursor.execute("UPDATE Товары SET Количество = Количество - ? WHERE ID_товара = ?",
-                               (int(quantity), product_id))
-                connection.commit()
-                connection.close()
+        def handle_add():
+            line = selected_line()
+            if line is None:
+                return
+            cart.append(line)
+            cart_list.addItem(f"{product_combo.currentText()} — {line[1]} шт")
+            quantity_input.clear()
 
+        def handle_submit():
+            lines = list(cart)
+            if not lines:
+                line = selected_line()
+                if line is None:
+                    return
+                lines = [line]
+
+            def handle_placed(order_ids):
+                submit_button.setEnabled(True)
                 QMessageBox.information(self, "Успех", "Заказ оформлен")
-                self.load_products(hide_id=True)
+                # Заказ меняет только остатки, версия каталога при этом не растёт
+                self.load_products(hide_id=True, force=True)
                 dialog.accept()
-            else:
-                QMessageBox.warning(self, "Ошибка", "Введите корректное количество")
+
+            submit_button.setEnabled(False)
+            self.run_task(lambda task: services.place_order(self.user_id, lines, actor=self.username),
+                          handle_placed, "Заказ не оформлен", parent=dialog,
+                          on_error=lambda: submit_button.setEnabled(True))
 
         layout.addRow("Товар:", product_combo)
         layout.addRow("Количество, шт:", quantity_input)
+        layout.addWidget(add_button)
+        layout.addRow("Корзина:", cart_list)
         layout.addWidget(submit_button)
+        add_button.clicked.connect(handle_add)
         submit_button.clicked.connect(handle_submit)
         dialog.setLayout(layout)
         dialog.exec()
 
     def view_my_orders(self):
-        connection, cursor = connect_db()
-        cursor.execute(
-            """SELECT Заказы.ID_заказа, Товары.Наименование, Заказы.Количество, Товары.Стоимость, 
-                      (Заказы.Количество * Товары.Стоимость) AS Общая_стоимость
-               FROM Заказы
-               JOIN Товары ON Заказы.ID_товара = Товары.ID_товара
-               WHERE Заказы.ID_пользователя = ?""",
-            (self.user_id,)
-        )
-        orders = cursor.fetchall()
-        connection.close()
-
         dialog = QDialog(self)
         dialog.setWindowTitle("Мои заказы")
         dialog.setGeometry(760, 440, 700, 400)
 
-        table = QTableWidget(len(orders), 5)
-        table.setHorizontalHeaderLabels(
-            ["ID заказа", "Наименование товара", "Количество, шт", "Цена за единицу, руб", "Стоимость заказа, руб"]
-        )
-
-        for row, order in enumerate(orders):
-            for column, item in enumerate(order):
-                table.setItem(row, column, QTableWidgetItem(str(item)))
+        table = tables.SqlTableView(tables.user_orders_model(self.user_id, parent=dialog))
 
         layout = QVBoxLayout()
         layout.addWidget(table)
@@ -750,18 +571,9 @@ class MainWindow(QMainWindow):
         dialog.exec()
 
     def cancel_order(self):
-        connection, cursor = connect_db()
-        cursor.execute(
-            """SELECT Заказы.ID_заказа, Товары.Наименование, Заказы.Количество 
-               FROM Заказы 
-               JOIN Товары ON Заказы.ID_товара = Товары.ID_товара 
-               WHERE Заказы.ID_пользователя = ?""",
-            (self.user_id,)
-        )
-        orders = cursor.fetchall()
-        connection.close()
-
-        if not orders:
+        user_orders = services.get_user_orders(self.user_id)
+
+        if not user_orders:
             QMessageBox.information(self, "Информация", "У вас нет заказов для отмены.")
             return
 
@@ -772,7 +584,7 @@ class MainWindow(QMainWindow):
         layout = QVBoxLayout()
         order_combo = QComboBox()
 
-        for order in orders:
+        for order in user_orders:
             order_combo.addItem(f"Заказ ID: {order[0]}, Товар: {order[1]}, Количество, шт: {order[2]}")
 
         confirm_button = QPushButton("Отменить заказ")
@@ -783,9 +595,8 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(dialog, "Ошибка", "Выберите заказ для отмены.")
                 return
 
-            selected_order_id = orders[selected_index][0]
-            selected_product_name = orders[selected_index][1]
-            selected_quantity = orders[selected_index][2]
+            selected_order_id = user_orders[selected_index][0]
+            selected_product_name = user_orders[selected_index][1]
 
             confirmation = QMessageBox.question(
                 self,
@@ -794,27 +605,16 @@ class MainWindow(QMainWindow):
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
             if confirmation == QMessageBox.StandardButton.Yes:
-                connection, cursor = connect_db()
-
                 try:
-                    cursor.execute(
-                        """UPDATE Товары 
-                           SET Количество = Количество + ? 
-                           WHERE Наименование = ?""",
-                        (selected_quantity, selected_product_name)
-                    )
-
-                    cursor.execute("DELETE FROM Заказы WHERE ID_заказа = ?", (selected_order_id,))
-                    connection.commit()
+                    if services.cancel_order(selected_order_id, self.user_id, actor=self.username):
+                        QMessageBox.information(self, "Успех", "Заказ отменен")
+                    else:
+                        QMessageBox.information(self, "Информация", "Заказ уже отменён.")
 
-                    QMessageBox.information(self, "Успех", "Заказ отменен")
-
-                    self.load_products(hide_id=self.user_id is not None)
+                    self.load_products(hide_id=self.user_id is not None, force=True)
 
                 except sqlite3.Error as e:
                     QMessageBox.warning(self, "Ошибка", f"Ошибка базы данных: {e}")
-                finally:
-                    connection.close()
 
                 dialog.accept()
 
@@ -827,20 +627,10 @@ class MainWindow(QMainWindow):
 
     def generate_stock_report(self):
         try:
-            products = get_all_products()
-            if not products:
+            if not reports.has_products():
                 QMessageBox.information(self, "Информация", "На складе нет товаров. Отчёт не создан.")
                 return
 
-            df = pd.DataFrame(products, columns=["ID", "Наименование", "Вес, гр", "Стоимость, руб", "Количество, шт"])
-
-            df["Стоимость, руб"] = pd.to_numeric(df["Стоимость, руб"], errors="coerce")
-            df["Количество, шт"] = pd.to_numeric(df["Количество, шт"], errors="coerce")
-
-            df["Сумма товара, руб"] = (df["Стоимость, руб"] * df["Количество, шт"]).round(2)
-
-            total_sum = df["Сумма товара, руб"].sum()
-
             report_file, _ = QFileDialog.getSaveFileName(self, "Сохранить отчёт", "Склад_товаров.xlsx",
                                                          "Excel Files (*.xlsx)")
 
@@ -848,38 +638,20 @@ class MainWindow(QMainWindow):
                 QMessageBox.information(self, "Отмена", "Сохранение отчёта отменено.")
                 return
 
-            with pd.ExcelWriter(report_file, engine="openpyxl") as writer:
-                df.to_excel(writer, sheet_name="Склад", index=False)
-
-                workbook = writer.book
-                summary_sheet = workbook.create_sheet(title="Общая сумма")
-                summary_sheet.append(["Общая сумма всех товаров на складе", f"{total_sum:.2f} руб."])
-
-            QMessageBox.information(self, "Успех", f"Отчёт успешно сохранён в {report_file}")
+            self.run_task(lambda task: reports.write_stock_report(report_file, task.report_progress),
+                          lambda total_sum: QMessageBox.information(self, "Успех",
+                                                                    f"Отчёт успешно сохранён в {report_file}"),
+                          "Ошибка при создании отчёта", progress_label="Формирование отчёта...")
 
         except Exception as e:
             QMessageBox.warning(self, "Ошибка", f"Ошибка при создании отчёта: {str(e)}")
 
     def generate_report(self):
         try:
-            orders = get_all_orders()
-            if not orders:
+            if not reports.has_orders():
                 QMessageBox.information(self, "Информация", "Нет заказов для отчёта.")
                 return
 
-            df_orders = pd.DataFrame(orders, columns=["ID", "Пользователь", "Товар", "Количество, шт", "Статус"])
-
-            df_orders["Сумма заказа"] = df_orders["Количество, шт"] * df_orders["Товар"].map(
-                lambda name: self.get_product_price(name))
-
-            total_sum = df_orders["Сумма заказа"].sum()
-
-            summary = df_orders.groupby(["Пользователь", "Товар"]).agg({
-                "Количество, шт": "sum",
-                "Сумма заказа": "sum"
-            }).reset_index()
-            summary.columns = ["Пользователь", "Товар", "Общее количество", "Общая сумма"]
-
             file_path, _ = QFileDialog.getSaveFileName(
                 self,
                 "Сохранить отчёт",
@@ -891,52 +663,93 @@ class MainWindow(QMainWindow):
                 QMessageBox.information(self, "Отмена", "Сохранение отчёта отменено.")
                 return
 
-            with pd.ExcelWriter(file_path, engine="openpyxl") as writer:
-                df_orders.to_excel(writer, sheet_name="Заказы", index=False)
-                summary.to_excel(writer, sheet_name="Итоги", index=False)
-
-                workbook = writer.book
-                worksheet = workbook.create_sheet(title="Общая сумма")
-                worksheet.append(["Общая сумма всех заказов", total_sum])
-
-            QMessageBox.information(self, "Отчёт", f"Отчёт успешно сохранён в: {file_path}")
+            self.run_task(lambda task: reports.write_orders_report(file_path, task.report_progress),
+                          lambda total_sum: QMessageBox.information(self, "Отчёт",
+                                                                    f"Отчёт успешно сохранён в: {file_path}"),
+                          "Ошибка при создании отчёта", progress_label="Формирование отчёта...")
 
         except Exception as e:
             QMessageBox.warning(self, "Ошибка", f"Ошибка при создании отчёта: {str(e)}")
 
-    def get_product_price(self, product_name):
-        connection, cursor = connect_db()
-        cursor.execute("SELECT Стоимость FROM Товары WHERE Наименование = ?", (product_name,))
-        result = cursor.fetchone()
-        connection.close()
-        return float(result[0]) if result else 0
-
     def view_changes(self):
-        connection, cursor = connect_db()
-        cursor.execute("SELECT * FROM ИсторияИзменений")
-        changes = cursor.fetchall()
-        connection.close()
         dialog = QDialog(self)
         dialog.setWindowTitle("История изменений")
-        dialog.resize(400, 200)
+        dialog.resize(900, 500)
+
+        model = tables.changes_model(parent=dialog)
+        entity_combo = QComboBox()
+        entity_combo.addItem("Все объекты", None)
+        for entity in history.ENTITIES:
+            entity_combo.addItem(entity, entity)
+        entity_combo.currentIndexChanged.connect(lambda index: model.set_entity(entity_combo.itemData(index)))
 
-        table = QTableWidget(len(changes), 2)
-        table.setHorizontalHeaderLabels(["ID", "Описание"])
-        for row, change in enumerate(changes):
-            for column, item in enumerate(change):
-                table.setItem(row, column, QTableWidgetItem(str(item)))
+        table = tables.SqlTableView(model)
         layout = QVBoxLayout()
+        layout.addWidget(entity_combo)
         layout.addWidget(table)
         dialog.setLayout(layout)
         dialog.exec()
 
+    def run_task(self, func, on_finished, error_message, parent=None, progress_label=None, on_error=None):
+        parent = parent or self
+        progress_dialog = None
+        if progress_label:
+            progress_dialog = QProgressDialog(progress_label, "Отмена", 0, 100, parent)
+            progress_dialog.setWindowTitle("Подождите")
+            progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+            progress_dialog.setAutoClose(False)
+            progress_dialog.setAutoReset(False)
+
+        def close_progress():
+            # hide(), а не close(): закрытие QProgressDialog вызывает сигнал canceled
+            if progress_dialog is not None:
+                progress_dialog.hide()
+                progress_dialog.deleteLater()
+
+        def handle_finished(result):
+            close_progress()
+            on_finished(result)
+
+        def handle_failed(message):
+            close_progress()
+            if on_error is not None:
+                on_error()
+            QMessageBox.warning(parent, "Ошибка", f"{error_message}: {message}")
+
+        def handle_cancelled():
+            close_progress()
+            if on_error is not None:
+                on_error()
+            QMessageBox.information(parent, "Отмена", "Операция отменена.")
+
+        task = workers.start(func, on_finished=handle_finished, on_failed=handle_failed,
+                             on_cancelled=handle_cancelled,
+                             on_progress=progress_dialog.setValue if progress_dialog is not None else None)
+        if progress_dialog is not None:
+            progress_dialog.canceled.connect(task.cancel)
+        return task
+
     def logout(self):
         self.close()
         self.login_window = LoginWindow()
         self.login_window.show()
 
 
-app = QApplication(sys.argv)
-login_window = LoginWindow()
-login_window.show()
-app.exec()
+def main():
+    app = QApplication(sys.argv)
+    # Без базы окно входа бесполезно: ошибку миграции показываем вместо трассировки в консоли
+    try:
+        warnings = services.open_database()
+    except Exception as e:
+        QMessageBox.critical(None, "Ошибка", f"Не удалось открыть базу данных: {str(e)}")
+        return 1
+    for warning in warnings:
+        QMessageBox.warning(None, "Обновление базы данных", warning)
+    app.aboutToQuit.connect(workers.shutdown)
+    login_window = LoginWindow()
+    login_window.show()
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+import sqlite3
+
+import db
+import units
+
+
+def create_tables(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Пользователи (
+                        ID_пользователя INTEGER PRIMARY KEY,
+                        Логин TEXT UNIQUE NOT NULL,
+                        Пароль TEXT NOT NULL,
+                        Роль TEXT NOT NULL
+                     )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Товары (
+                        ID_товара INTEGER PRIMARY KEY,
+                        Наименование TEXT NOT NULL,
+                        Вес TEXT NOT NULL,
+                        Стоимость TEXT NOT NULL,
+                        Количество INTEGER DEFAULT 0  -- Добавлено поле Количество
+                     )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Заказы (
+                        ID_заказа INTEGER PRIMARY KEY,
+                        ID_пользователя INTEGER,
+                        ID_товара INTEGER,
+                        Количество INTEGER,
+                        Статус TEXT NOT NULL,
+                        FOREIGN KEY(ID_пользователя) REFERENCES Пользователи(ID_пользователя),
+                        FOREIGN KEY(ID_товара) REFERENCES Товары(ID_товара)
+                     )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS ИсторияИзменений (
+                        ID INTEGER PRIMARY KEY,
+                        Описание TEXT NOT NULL
+                     )''')
+
+
+def legacy_number(parse, value):
+    # None, если значение из старой текстовой схемы не разбирается
+    try:
+        return parse(str(value))
+    except ValueError:
+        return None
+
+
+def numeric_products(cursor):
+    # Вес хранится в граммах (REAL), Стоимость в копейках (INTEGER).
+    # Тип столбца в SQLite не меняется через ALTER, поэтому таблица пересоздаётся.
+    cursor.execute('''CREATE TABLE Товары_new (
+                        ID_товара INTEGER PRIMARY KEY,
+                        Наименование TEXT NOT NULL,
+                        Вес REAL NOT NULL,
+                        Стоимость INTEGER NOT NULL,
+                        Количество INTEGER NOT NULL DEFAULT 0
+                     )''')
+    # Значения разбираются теми же функциями, что и ввод в окне (CAST в SQL молча превращал
+    # '1 500.00' в 1). Старое окно редактирования записывало Вес = '', если заполнены только
+    # цена и количество: пустые и нечитаемые значения заменяются на 0, а ID таких товаров
+    # попадают в историю изменений и в предупреждение администратору
+    products = []
+    invalid = []
+    for product_id, name, weight, price, quantity in cursor.execute(
+            "SELECT ID_товара, Наименование, Вес, Стоимость, Количество FROM Товары"):
+        weight = legacy_number(units.parse_weight, weight)
+        price = legacy_number(units.parse_price, price)
+        if weight is None or price is None:
+            invalid.append(product_id)
+        products.append((product_id, name, weight or 0, price or 0, quantity if quantity is not None else 0))
+    cursor.executemany("INSERT INTO Товары_new (ID_товара, Наименование, Вес, Стоимость, Количество) "
+                       "VALUES (?, ?, ?, ?, ?)", products)
+    cursor.execute("DROP TABLE Товары")
+    cursor.execute("ALTER TABLE Товары_new RENAME TO Товары")
+    if invalid:
+        message = ("Вес или стоимость товаров с ID " + ", ".join(map(str, invalid))
+                   + " не удалось распознать, они заменены на 0. Проверьте эти товары.")
+        cursor.execute("INSERT INTO ИсторияИзменений (Описание) VALUES (?)", (message,))
+        return message
+
+
+def indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS Заказы_ID_пользователя_idx ON Заказы (ID_пользователя)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS Заказы_ID_товара_idx ON Заказы (ID_товара)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS Товары_Наименование_idx ON Товары (Наименование)")
+
+
+def table_versions(cursor):
+    # Счётчик изменений таблицы Товары, по нему catalog.py понимает, что кэш устарел
+    cursor.execute('''CREATE TABLE IF NOT EXISTS ВерсииТаблиц (
+                        Таблица TEXT PRIMARY KEY,
+                        Версия INTEGER NOT NULL DEFAULT 0
+                     )''')
+    cursor.execute("INSERT OR IGNORE INTO ВерсииТаблиц (Таблица, Версия) VALUES ('Товары', 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS Товары_версия_{event.lower()} AFTER {event} ON Товары
+                           BEGIN
+                               UPDATE ВерсииТаблиц SET Версия = Версия + 1 WHERE Таблица = 'Товары';
+                           END''')
+
+
+def audit_history(cursor):
+    # Структурированные записи истории; у старых записей новые поля остаются пустыми.
+    # Индекс по Объект хранит строки в порядке ID, поэтому страница истории
+    # по одному типу объектов читается без сортировки.
+    for column in ("Время TEXT", "Пользователь TEXT", "Объект TEXT", "ID_объекта INTEGER", "Действие TEXT"):
+        cursor.execute(f"ALTER TABLE ИсторияИзменений ADD COLUMN {column}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ИсторияИзменений_Объект_idx ON ИсторияИзменений (Объект)")
+
+    # Полнотекстовый индекс без копии данных (external content), его содержимое ведут триггеры
+    try:
+        cursor.execute('''CREATE VIRTUAL TABLE ИсторияИзменений_fts USING fts5(
+                            Описание, Пользователь, Объект, Действие,
+                            content='ИсторияИзменений', content_rowid='ID'
+                         )''')
+    except sqlite3.OperationalError:
+        # SQLite собран без FTS5: поиск по истории выполняется через LIKE
+        return
+    columns = "Описание, Пользователь, Объект, Действие"
+    new_values = "new.Описание, new.Пользователь, new.Объект, new.Действие"
+    old_values = "old.Описание, old.Пользователь, old.Объект, old.Действие"
+    cursor.execute(f'''CREATE TRIGGER ИсторияИзменений_fts_insert AFTER INSERT ON ИсторияИзменений
+                       BEGIN
+                           INSERT INTO ИсторияИзменений_fts (rowid, {columns}) VALUES (new.ID, {new_values});
+                       END''')
+    cursor.execute(f'''CREATE TRIGGER ИсторияИзменений_fts_delete AFTER DELETE ON ИсторияИзменений
+                       BEGIN
+                           INSERT INTO ИсторияИзменений_fts (ИсторияИзменений_fts, rowid, {columns})
+                           VALUES ('delete', old.ID, {old_values});
+                       END''')
+    cursor.execute(f'''CREATE TRIGGER ИсторияИзменений_fts_update AFTER UPDATE ON ИсторияИзменений
+                       BEGIN
+                           INSERT INTO ИсторияИзменений_fts (ИсторияИзменений_fts, rowid, {columns})
+                           VALUES ('delete', old.ID, {old_values});
+                           INSERT INTO ИсторияИзменений_fts (rowid, {columns}) VALUES (new.ID, {new_values});
+                       END''')
+    cursor.execute("INSERT INTO ИсторияИзменений_fts (ИсторияИзменений_fts) VALUES ('rebuild')")
+
+
+def product_version_columns(cursor):
+    # Списание остатка при каждом заказе не должно сбрасывать кэш каталога:
+    # версия растёт только при изменении наименования, веса или цены,
+    # а остатки catalog.py дочитывает отдельно
+    cursor.execute("DROP TRIGGER IF EXISTS Товары_версия_update")
+    cursor.execute('''CREATE TRIGGER Товары_версия_update AFTER UPDATE OF Наименование, Вес, Стоимость ON Товары
+                      BEGIN
+                          UPDATE ВерсииТаблиц SET Версия = Версия + 1 WHERE Таблица = 'Товары';
+                      END''')
+
+
+def search_index(cursor):
+    # Поиск в таблицах товаров и заказов идёт по полнотекстовым индексам, а не сравнением
+    # текста каждой строки. Индекс товаров хранит вес и цену в том виде, в каком они
+    # показаны в таблице (как units.format_weight и units.format_price), поэтому он без
+    # собственных данных (content=''), а прежние значения для удаления вычисляют триггеры
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE Товары_fts USING fts5(Наименование, Вес, Стоимость, content='')")
+    except sqlite3.OperationalError:
+        # SQLite собран без FTS5: поиск в таблицах выполняется через LIKE
+        return
+    columns = "Наименование, Вес, Стоимость"
+    displayed = "{0}.Наименование, printf('%g', {0}.Вес), printf('%.2f', {0}.Стоимость / 100.0)"
+    cursor.execute(f'''CREATE TRIGGER Товары_fts_insert AFTER INSERT ON Товары
+                       BEGIN
+                           INSERT INTO Товары_fts (rowid, {columns}) VALUES (new.ID_товара, {displayed.format("new")});
+                       END''')
+    cursor.execute(f'''CREATE TRIGGER Товары_fts_delete AFTER DELETE ON Товары
+                       BEGIN
+                           INSERT INTO Товары_fts (Товары_fts, rowid, {columns})
+                           VALUES ('delete', old.ID_товара, {displayed.format("old")});
+                       END''')
+    # Списание остатков индекс не затрагивает
+    cursor.execute(f'''CREATE TRIGGER Товары_fts_update AFTER UPDATE OF Наименование, Вес, Стоимость ON Товары
+                       BEGIN
+                           INSERT INTO Товары_fts (Товары_fts, rowid, {columns})
+                           VALUES ('delete', old.ID_товара, {displayed.format("old")});
+                           INSERT INTO Товары_fts (rowid, {columns}) VALUES (new.ID_товара, {displayed.format("new")});
+                       END''')
+    cursor.execute(f"INSERT INTO Товары_fts (rowid, {columns}) SELECT ID_товара, {displayed.format('Товары')} FROM Товары")
+
+    # Логины хранятся как есть, поэтому индекс пользователей ссылается на саму таблицу
+    cursor.execute("CREATE VIRTUAL TABLE Пользователи_fts USING fts5("
+                   "Логин, content='Пользователи', content_rowid='ID_пользователя')")
+    cursor.execute('''CREATE TRIGGER Пользователи_fts_insert AFTER INSERT ON Пользователи
+                      BEGIN
+                          INSERT INTO Пользователи_fts (rowid, Логин) VALUES (new.ID_пользователя, new.Логин);
+                      END''')
+    cursor.execute('''CREATE TRIGGER Пользователи_fts_delete AFTER DELETE ON Пользователи
+                      BEGIN
+                          INSERT INTO Пользователи_fts (Пользователи_fts, rowid, Логин)
+                          VALUES ('delete', old.ID_пользователя, old.Логин);
+                      END''')
+    cursor.execute('''CREATE TRIGGER Пользователи_fts_update AFTER UPDATE OF Логин ON Пользователи
+                      BEGIN
+                          INSERT INTO Пользователи_fts (Пользователи_fts, rowid, Логин)
+                          VALUES ('delete', old.ID_пользователя, old.Логин);
+                          INSERT INTO Пользователи_fts (rowid, Логин) VALUES (new.ID_пользователя, new.Логин);
+                      END''')
+    cursor.execute("INSERT INTO Пользователи_fts (Пользователи_fts) VALUES ('rebuild')")
+
+
+# Номер миграции = значение PRAGMA user_version после её применения.
+# Новые миграции добавляются только в конец списка. Миграция может вернуть
+# предупреждение для администратора, migrate() возвращает их список.
+MIGRATIONS = [
+    create_tables,
+    numeric_products,
+    indexes,
+    table_versions,
+    audit_history,
+    product_version_columns,
+    search_index,
+]
+
+
+def schema_version(connection):
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(path=None):
+    connection = db.open_connection(path)
+    try:
+        if schema_version(connection) >= len(MIGRATIONS):
+            return []
+        # IMMEDIATE: если несколько клиентов стартуют одновременно, миграцию выполнит только первый
+        connection.execute("BEGIN IMMEDIATE")
+        warnings = []
+        try:
+            version = schema_version(connection)
+            for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                warning = migration(connection)
+                if warning:
+                    warnings.append(warning)
+                connection.execute(f"PRAGMA user_version = {number}")
+        except BaseException:
+            connection.rollback()
+            raise
+        connection.commit()
+        return warnings
+    finally:
+        connection.close()
@@ -0,0 +1,96 @@
+import random
+import sqlite3
+import time
+
+import db
+import history
+
+NEW_ORDER_STATUS = "Заказ принят"
+MAX_ATTEMPTS = 8
+BASE_DELAY = 0.01
+MAX_DELAY = 0.5
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_id):
+        super().__init__(f"Недостаточно товара на складе (ID товара {product_id})")
+        self.product_id = product_id
+
+
+def is_busy(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def with_retry(func, *args):
+    # busy_timeout уже ждёт освобождения блокировки; сюда доходят случаи, когда
+    # ожидание истекло. Повтор с экспоненциальной задержкой и случайным разбросом,
+    # чтобы терминалы не просыпались одновременно.
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return func(*args)
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(min(MAX_DELAY, BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def normalize_cart(cart):
+    quantities = {}
+    for product_id, quantity in cart:
+        quantity = int(quantity)
+        if quantity <= 0:
+            raise ValueError("Количество товара должно быть больше 0!")
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    if not quantities:
+        raise ValueError("Корзина пуста")
+    return list(quantities.items())
+
+
+def _place_order(user_id, lines, actor):
+    # BEGIN IMMEDIATE берёт блокировку записи сразу, а остаток проверяется и
+    # уменьшается одним условным UPDATE: между проверкой и списанием никто не вклинится
+    with db.transaction(immediate=True) as cursor:
+        order_ids = []
+        for product_id, quantity in lines:
+            updated = cursor.execute(
+                "UPDATE Товары SET Количество = Количество - ? WHERE ID_товара = ? AND Количество >= ?",
+                (quantity, product_id, quantity)).rowcount
+            if updated == 0:
+                raise OutOfStock(product_id)
+            order_id = cursor.execute(
+                "INSERT INTO Заказы (ID_пользователя, ID_товара, Количество, Статус) VALUES (?, ?, ?, ?)",
+                (user_id, product_id, quantity, NEW_ORDER_STATUS)).lastrowid
+            history.record(f"Оформлен заказ {order_id}: товар с ID {product_id}, {quantity} шт",
+                           actor, "Заказ", order_id, "Оформление")
+            order_ids.append(order_id)
+        return order_ids
+
+
+def place_order(user_id, cart, actor=None):
+    # cart: [(ID_товара, количество), ...]; все строки оформляются в одной транзакции или ни одна.
+    # actor: логин того, кто оформил заказ, для истории изменений
+    return with_retry(_place_order, user_id, normalize_cart(cart), actor)
+
+
+def _cancel_order(order_id, user_id, actor):
+    with db.transaction(immediate=True) as cursor:
+        if user_id is None:
+            order = cursor.execute("SELECT ID_товара, Количество FROM Заказы WHERE ID_заказа = ?",
+                                   (order_id,)).fetchone()
+        else:
+            order = cursor.execute(
+                "SELECT ID_товара, Количество FROM Заказы WHERE ID_заказа = ? AND ID_пользователя = ?",
+                (order_id, user_id)).fetchone()
+        if order is None:
+            return False
+        product_id, quantity = order
+        cursor.execute("UPDATE Товары SET Количество = Количество + ? WHERE ID_товара = ?", (quantity, product_id))
+        cursor.execute("DELETE FROM Заказы WHERE ID_заказа = ?", (order_id,))
+        history.record(f"Отменён заказ {order_id}: товар с ID {product_id}, {quantity} шт",
+                       actor, "Заказ", order_id, "Отмена")
+        return True
+
+
+def cancel_order(order_id, user_id=None, actor=None):
+    return with_retry(_cancel_order, order_id, user_id, actor)
@@ -0,0 +1,238 @@
+import atexit
+import csv
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+# Профилировщик запросов SQLite. Включается переменной окружения:
+#   WAREHOUSE_PROFILE=1                      сводка в stderr при выходе
+#   WAREHOUSE_PROFILE=/tmp/queries.csv       сводка в CSV (или .json)
+#   WAREHOUSE_PROFILE=/tmp/queries-{pid}.csv отдельный файл на процесс
+# Выключенный профилировщик ничего не стоит: соединения открываются обычным sqlite3.Connection.
+PROFILE = os.environ.get("WAREHOUSE_PROFILE", "")
+ENABLED = PROFILE not in ("", "0")
+TOP = 25
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+_SPACES = re.compile(r"\s+")
+
+_stats = {}  # запрос -> [выполнений, суммарное время, максимальное время выполнения]
+_lock = threading.Lock()
+
+
+def normalize(statement):
+    # set_trace_callback передаёт запрос с подставленными параметрами,
+    # литералы заменяются на ?, чтобы одинаковые запросы попадали в одну строку
+    return _SPACES.sub(" ", _LITERALS.sub("?", statement)).strip()
+
+
+def record(statement):
+    with _lock:
+        entry = _stats.setdefault(statement, [0, 0.0, 0.0])
+        entry[0] += 1
+
+
+def add_time(statement, elapsed):
+    with _lock:
+        entry = _stats.setdefault(statement, [0, 0.0, 0.0])
+        entry[1] += elapsed
+
+
+def finish(statement, elapsed):
+    # elapsed: время одного выполнения целиком, от execute до чтения последней строки
+    with _lock:
+        entry = _stats.setdefault(statement, [0, 0.0, 0.0])
+        entry[2] = max(entry[2], elapsed)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def snapshot():
+    # [(запрос, выполнений, суммарное время, максимальное время выполнения)], самые дорогие первыми
+    with _lock:
+        rows = [(statement, count, total, longest) for statement, (count, total, longest) in _stats.items()]
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+def summary(limit=TOP):
+    rows = snapshot()
+    lines = [f"{'всего, мс':>10} {'раз':>8} {'сред, мс':>9} {'макс, мс':>9}  запрос"]
+    for statement, count, total, longest in rows[:limit]:
+        average = total / count if count else 0
+        lines.append(f"{total * 1000:10.1f} {count:8} {average * 1000:9.3f} {longest * 1000:9.3f}  "
+                     f"{statement[:120]}")
+    if len(rows) > limit:
+        lines.append(f"... ещё {len(rows) - limit} запросов")
+    return "\n".join(lines)
+
+
+def export(destination=None):
+    destination = destination or PROFILE
+    if destination in ("1", "stderr"):
+        print(summary(), file=sys.stderr)
+        return
+    path = destination.format(pid=os.getpid())
+    rows = snapshot()
+    if path.endswith(".json"):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump([{"statement": statement, "count": count, "total": total, "max": longest}
+                       for statement, count, total, longest in rows], file, ensure_ascii=False, indent=1)
+        return
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["statement", "count", "total_s", "max_s"])
+        writer.writerows(rows)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    # Время выполнения и чтения строк относится к запросу, который
+    # set_trace_callback сообщил во время последнего execute этого курсора.
+    # Максимум считается по выполнению целиком: время execute и всех fetch
+    # складывается и учитывается, когда строки кончились, курсор выполняет
+    # следующий запрос, закрыт или удалён
+    _statement = None
+    _elapsed = 0.0
+
+    def _add(self, elapsed):
+        if self._statement is not None:
+            add_time(self._statement, elapsed)
+            self._elapsed += elapsed
+
+    def _finish(self):
+        if self._statement is not None:
+            finish(self._statement, self._elapsed)
+        self._statement = None
+        self._elapsed = 0.0
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            self._add(time.perf_counter() - started)
+
+    def _execute(self, method, *args):
+        self._finish()
+        connection = self.connection
+        connection._traced = None
+        connection._traced_key = None
+        started = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            self._statement = connection._traced_key
+            self._add(time.perf_counter() - started)
+            # Запрос без результата (INSERT, UPDATE, executemany) завершён сразу
+            if self.description is None:
+                self._finish()
+
+    def execute(self, sql, parameters=()):
+        return self._execute(sqlite3.Cursor.execute, sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self._execute(sqlite3.Cursor.executemany, sql, parameters)
+
+    def executescript(self, script):
+        return self._execute(sqlite3.Cursor.executescript, script)
+
+    def fetchone(self):
+        row = self._timed(sqlite3.Cursor.fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(sqlite3.Cursor.fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(sqlite3.Cursor.fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._timed(sqlite3.Cursor.__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class ProfiledConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._traced = None
+        self._traced_key = None
+        self.set_trace_callback(self._trace)
+
+    def _trace(self, statement):
+        # Срабатывание триггера SQLite сообщает повторным событием с текстом того же запроса,
+        # а запросы внутри триггеров и FTS5 — событиями, начинающимися с "--". Их время и
+        # количество относятся к запросу верхнего уровня, который их вызвал
+        if statement == self._traced or statement.startswith("--"):
+            return
+        self._traced = statement
+        self._traced_key = normalize(statement)
+        record(self._traced_key)
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or ProfiledCursor)
+
+    # sqlite3.Connection.execute создаёт обычный курсор, минуя cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            elapsed = time.perf_counter() - started
+            add_time("COMMIT", elapsed)
+            finish("COMMIT", elapsed)
+
+    def rollback(self):
+        started = time.perf_counter()
+        try:
+            super().rollback()
+        finally:
+            elapsed = time.perf_counter() - started
+            add_time("ROLLBACK", elapsed)
+            finish("ROLLBACK", elapsed)
+
+
+def connection_class():
+    return ProfiledConnection if ENABLED else sqlite3.Connection
+
+
+def enable():
+    # Профилируются соединения, открытые после вызова
+    global ENABLED
+    ENABLED = True
+
+
+if ENABLED:
+    atexit.register(export)
@@ -0,0 +1,189 @@
+import catalog
+import db
+
+CHUNK_SIZE = 50000
+# Лист Excel вмещает 1 048 576 строк, одна из них занята заголовком
+MAX_SHEET_ROWS = 1048575
+
+# pandas и openpyxl импортируются внутри функций, которые строят отчёт:
+# их загрузка занимает большую часть времени запуска, а нужны они только здесь.
+
+# Стоимость хранится в копейках: суммы считаются в целых копейках, в отчёт выводятся рубли.
+# Наименования и цены товаров берутся из кэша каталога по ID_товара,
+# из базы читаются только строки заказов.
+ORDERS_QUERY = """SELECT Заказы.ID_заказа, Пользователи.Логин, Заказы.ID_товара, Заказы.Количество,
+                         Заказы.Статус
+                  FROM Заказы
+                  JOIN Пользователи ON Заказы.ID_пользователя = Пользователи.ID_пользователя
+                  ORDER BY Заказы.ID_заказа"""
+
+ORDERS_SUMMARY_QUERY = """SELECT Пользователи.Логин, Заказы.ID_товара, SUM(Заказы.Количество)
+                          FROM Заказы
+                          JOIN Пользователи ON Заказы.ID_пользователя = Пользователи.ID_пользователя
+                          GROUP BY Заказы.ID_пользователя, Заказы.ID_товара
+                          ORDER BY Пользователи.Логин, Заказы.ID_товара"""
+
+RECEIPT_QUERY = """SELECT ID_товара, Количество
+                   FROM Заказы
+                   WHERE ID_пользователя = ?
+                   ORDER BY ID_заказа"""
+
+
+def has_products():
+    return catalog.get_catalog().count() > 0
+
+
+def has_orders():
+    return db.fetch_one("SELECT EXISTS (SELECT 1 FROM Заказы)")[0] == 1
+
+
+def has_user_orders(user_id):
+    return db.fetch_one("SELECT EXISTS (SELECT 1 FROM Заказы WHERE ID_пользователя = ?)", (user_id,))[0] == 1
+
+
+def read_chunks(connection, sql, params=(), columns=None):
+    import pandas as pd
+    for chunk in pd.read_sql_query(sql, connection, params=params, chunksize=CHUNK_SIZE):
+        if columns is not None:
+            chunk.columns = columns
+        yield chunk
+
+
+class SheetWriter:
+    # Строки, не поместившиеся на лист, продолжаются на листах «Заказы (2)», «Заказы (3)», ...
+    # с тем же заголовком: openpyxl сохраняет лист любой длины, но Excel открывает его не полностью
+    def __init__(self, workbook, title, header):
+        self.workbook = workbook
+        self.title = title
+        self.header = header
+        self.sheets = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self.sheets += 1
+        self.sheet = self.workbook.create_sheet(self.title if self.sheets == 1 else f"{self.title} ({self.sheets})")
+        self.sheet.append(self.header)
+        self.rows = 0
+
+    def append(self, row):
+        if self.rows >= MAX_SHEET_ROWS:
+            self._new_sheet()
+        self.sheet.append(row)
+        self.rows += 1
+
+
+def append_frame(sheet, frame):
+    for row in frame.itertuples(index=False, name=None):
+        sheet.append(row)
+
+
+def count_rows(connection, sql, params=()):
+    return connection.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+
+
+def product_lookup():
+    import pandas as pd
+    products = catalog.get_catalog()
+    names = pd.Series(products.names(), dtype=object)
+    prices = pd.Series(products.prices(), dtype="float64")
+    return names, prices
+
+
+def attach_products(df, names, prices):
+    # Заказы удалённых товаров пропускаются, как раньше при JOIN с Товары
+    product_ids = df.pop("ID_товара")
+    price = product_ids.map(prices)
+    known = price.notna()
+    return df[known].copy(), product_ids[known].map(names), price[known]
+
+
+def write_stock_report(file_path, progress=None):
+    from openpyxl import Workbook
+    import pandas as pd
+
+    # write_only: строки сразу уходят в файл, в памяти держится только текущая порция
+    workbook = Workbook(write_only=True)
+    columns = ["ID", "Наименование", "Вес, гр", "Стоимость, руб", "Количество, шт"]
+    sheet = SheetWriter(workbook, "Склад", columns + ["Сумма товара, руб"])
+    total_kopecks = 0
+
+    products = catalog.get_catalog().products()
+    for start in range(0, len(products), CHUNK_SIZE):
+        df = pd.DataFrame(products[start:start + CHUNK_SIZE], columns=columns)
+        total_kopecks += int((df["Стоимость, руб"] * df["Количество, шт"]).sum())
+        df["Сумма товара, руб"] = df["Стоимость, руб"] * df["Количество, шт"] / 100
+        df["Стоимость, руб"] = df["Стоимость, руб"] / 100
+        append_frame(sheet, df)
+        if progress:
+            progress(start + len(df), len(products))
+
+    total_sum = total_kopecks / 100
+    summary_sheet = workbook.create_sheet("Общая сумма")
+    summary_sheet.append(["Общая сумма всех товаров на складе", f"{total_sum:.2f} руб."])
+    workbook.save(file_path)
+    return total_sum
+
+
+def write_orders_report(file_path, progress=None):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    orders_sheet = SheetWriter(workbook, "Заказы", ["ID", "Пользователь", "Товар", "Количество, шт", "Статус",
+                                                    "Сумма заказа"])
+    total_kopecks = 0
+    done = 0
+    names, prices = product_lookup()
+
+    with db.connection() as connection:
+        total = count_rows(connection, ORDERS_QUERY) if progress else 0
+        for df in read_chunks(connection, ORDERS_QUERY):
+            done += len(df)
+            df, product_names, price = attach_products(df, names, prices)
+            df.insert(2, "Товар", product_names)
+            order_kopecks = df["Количество"] * price
+            total_kopecks += int(order_kopecks.sum())
+            df["Сумма заказа"] = order_kopecks / 100
+            append_frame(orders_sheet, df)
+            if progress:
+                progress(done, total)
+
+        summary_sheet = SheetWriter(workbook, "Итоги", ["Пользователь", "Товар", "Общее количество", "Общая сумма"])
+        for df in read_chunks(connection, ORDERS_SUMMARY_QUERY, columns=["Логин", "ID_товара", "Количество"]):
+            df, product_names, price = attach_products(df, names, prices)
+            df.insert(1, "Товар", product_names)
+            df["Сумма"] = df["Количество"] * price / 100
+            append_frame(summary_sheet, df)
+
+    total_sum = total_kopecks / 100
+    total_sheet = workbook.create_sheet("Общая сумма")
+    total_sheet.append(["Общая сумма всех заказов", total_sum])
+    workbook.save(file_path)
+    return total_sum
+
+
+def write_receipt(user_id, file_path, progress=None):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = SheetWriter(workbook, "Чек", ["Товар", "Количество, шт", "Цена за единицу, руб", "Сумма товара, руб"])
+    total_kopecks = 0
+    done = 0
+    names, prices = product_lookup()
+
+    with db.connection() as connection:
+        total = count_rows(connection, RECEIPT_QUERY, (user_id,)) if progress else 0
+        for df in read_chunks(connection, RECEIPT_QUERY, (user_id,)):
+            done += len(df)
+            df, product_names, price = attach_products(df, names, prices)
+            df.insert(0, "Товар", product_names)
+            total_kopecks += int((df["Количество"] * price).sum())
+            df["Цена"] = price / 100
+            df["Сумма"] = df["Количество"] * price / 100
+            append_frame(sheet, df)
+            if progress:
+                progress(done, total)
+
+    total_sum = total_kopecks / 100
+    sheet.append(["Общая сумма заказа:", f"{total_sum:.2f} руб"])
+    workbook.save(file_path)
+    return total_sum
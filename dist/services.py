@@ -0,0 +1,178 @@
+import re
+import sqlite3
+
+import catalog
+import db
+import history
+import migrations
+import orders
+
+# Операции приложения без зависимости от Qt: их используют окно (main.py),
+# пакетный режим (cli.py) и бенчмарки. Отчёты находятся в reports.py.
+# actor: логин пользователя, выполнившего изменение, записывается в историю.
+
+PASSWORD_RULES = ("Пароль должен быть не менее 6 символов и содержать хотя бы один "
+                  "специальный символ (!, ?, :, _, -, +)")
+ROLES = ["Пользователь", "Сотрудник", "Администратор"]
+ORDER_STATUSES = [orders.NEW_ORDER_STATUS, "Идет сбор заказа", "Готов к выдаче", "Выдан"]
+
+
+def open_database(path=None):
+    # Явная инициализация вместо миграции при импорте модуля.
+    # Возвращает предупреждения миграций, которые нужно показать администратору
+    if path is not None:
+        db.configure(path)
+    return migrations.migrate()
+
+
+def validate_password(password):
+    return len(password) >= 6 and re.search(r"[!?:_\-+]", password)
+
+
+def register_user(login, password, role="Пользователь"):
+    if not validate_password(password):
+        raise ValueError(PASSWORD_RULES)
+    try:
+        with db.transaction() as cursor:
+            user_id = cursor.execute("INSERT INTO Пользователи (Логин, Пароль, Роль) VALUES (?, ?, ?)",
+                                     (login, password, role)).lastrowid
+            record_change(f"Зарегистрирован пользователь {login}", login, "Пользователь", user_id, "Регистрация")
+    except sqlite3.IntegrityError:
+        raise ValueError("Логин уже существует!")
+    return user_id
+
+
+def authenticate_user(login, password):
+    if login == "admin" and password == "admin":
+        return "Администратор"
+
+    result = db.fetch_one("SELECT Роль FROM Пользователи WHERE Логин = ? AND Пароль = ?", (login, password))
+    return result[0] if result else None
+
+
+def get_user_id(login):
+    user = db.fetch_one("SELECT ID_пользователя FROM Пользователи WHERE Логин = ?", (login,))
+    return user[0] if user else None
+
+
+def get_all_users():
+    users = db.fetch_all("SELECT ID_пользователя, Логин, Роль FROM Пользователи")
+    return users if users else []
+
+
+def update_user_role(user_id, new_role, actor=None):
+    update_user_roles({user_id: new_role}, actor)
+
+
+def update_user_roles(roles, actor=None):
+    # roles: {ID_пользователя: роль}; в историю попадают только действительно изменённые роли
+    with db.transaction() as cursor:
+        for user_id, role in roles.items():
+            user = cursor.execute("SELECT Логин, Роль FROM Пользователи WHERE ID_пользователя = ?",
+                                  (user_id,)).fetchone()
+            if user is None or user[1] == role:
+                continue
+            cursor.execute("UPDATE Пользователи SET Роль = ? WHERE ID_пользователя = ?", (role, user_id))
+            record_change(f"Роль пользователя {user[0]} изменена: {user[1]} -> {role}",
+                          actor, "Пользователь", user_id, "Смена роли")
+
+
+def delete_users(user_ids, actor=None):
+    with db.transaction() as cursor:
+        for user_id in user_ids:
+            user = cursor.execute("SELECT Логин FROM Пользователи WHERE ID_пользователя = ?", (user_id,)).fetchone()
+            if user is None:
+                continue
+            cursor.execute("DELETE FROM Пользователи WHERE ID_пользователя = ?", (user_id,))
+            record_change(f"Удалён пользователь {user[0]}", actor, "Пользователь", user_id, "Удаление")
+
+
+def get_all_products():
+    return catalog.get_catalog().products()
+
+
+def products_version():
+    # Меняется при добавлении и удалении товаров и изменении наименования, веса или цены,
+    # но не при списании остатков; товары при этом не перечитываются
+    return catalog.get_catalog().current_version()
+
+
+def get_product(product_id):
+    return catalog.get_catalog().get(product_id)
+
+
+def add_product(name, weight, price, quantity, actor=None):
+    # weight в граммах, price в копейках
+    with db.transaction() as cursor:
+        product_id = cursor.execute(
+            "INSERT INTO Товары (Наименование, Вес, Стоимость, Количество) VALUES (?, ?, ?, ?)",
+            (name, weight, price, quantity)).lastrowid
+        record_change(f"Добавлен товар: {name} в количестве {quantity}", actor, "Товар", product_id, "Добавление")
+    return product_id
+
+
+def update_product(product_id, name=None, weight=None, price=None, quantity=None, actor=None):
+    # Значения None оставляют прежнее значение
+    with db.transaction() as cursor:
+        updated = cursor.execute(
+            "UPDATE Товары SET Наименование = COALESCE(?, Наименование), Вес = COALESCE(?, Вес), "
+            "Стоимость = COALESCE(?, Стоимость), Количество = COALESCE(?, Количество) "
+            "WHERE ID_товара = ?",
+            (name, weight, price, quantity, product_id)).rowcount
+        if updated:
+            record_change(f"Изменен товар с ID {product_id}", actor, "Товар", product_id, "Изменение")
+    return updated > 0
+
+
+def delete_product(product_id, actor=None):
+    with db.transaction() as cursor:
+        product = cursor.execute("SELECT Наименование FROM Товары WHERE ID_товара = ?", (product_id,)).fetchone()
+        if product is None:
+            return False
+        cursor.execute("DELETE FROM Товары WHERE ID_товара = ?", (product_id,))
+        record_change(f"Удалён товар: {product[0]}", actor, "Товар", product_id, "Удаление")
+    return True
+
+
+def get_all_orders():
+    return db.fetch_all(
+        "SELECT Заказы.ID_заказа, Пользователи.Логин, Товары.Наименование, Заказы.Количество, Заказы.Статус FROM Заказы "
+        "JOIN Пользователи ON Заказы.ID_пользователя = Пользователи.ID_пользователя "
+        "JOIN Товары ON Заказы.ID_товара = Товары.ID_товара")
+
+
+def get_user_orders(user_id):
+    return db.fetch_all(
+        """SELECT Заказы.ID_заказа, Товары.Наименование, Заказы.Количество
+           FROM Заказы
+           JOIN Товары ON Заказы.ID_товара = Товары.ID_товара
+           WHERE Заказы.ID_пользователя = ?""",
+        (user_id,))
+
+
+def get_users_with_orders():
+    return db.fetch_all("SELECT DISTINCT Пользователи.ID_пользователя, Пользователи.Логин FROM Заказы "
+                        "JOIN Пользователи ON Заказы.ID_пользователя = Пользователи.ID_пользователя")
+
+
+def place_order(user_id, cart, actor=None):
+    return orders.place_order(user_id, cart, actor)
+
+
+def cancel_order(order_id, user_id=None, actor=None):
+    return orders.cancel_order(order_id, user_id, actor)
+
+
+def update_order_status(order_id, status, actor=None):
+    with db.transaction() as cursor:
+        updated = cursor.execute("UPDATE Заказы SET Статус = ? WHERE ID_заказа = ? AND Статус <> ?",
+                                 (status, order_id, status)).rowcount
+        if updated:
+            record_change(f"Статус заказа {order_id} изменён на «{status}»", actor, "Заказ", order_id,
+                          "Смена статуса")
+    return updated > 0
+
+
+def record_change(description, actor=None, entity=None, entity_id=None, action=None):
+    # Внутри db.transaction() запись попадает в ту же транзакцию, что и само изменение
+    history.record(description, actor, entity, entity_id, action)
@@ -0,0 +1,320 @@
+import re
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QTableView, QAbstractItemView, QMessageBox
+
+import db
+import history
+import units
+import workers
+
+CHUNK_SIZE = 200
+PRODUCTS_FTS = "Товары_fts"
+USERS_FTS = "Пользователи_fts"
+
+_WORDS = re.compile(r"\w+")
+
+
+def match_query(text):
+    # Каждое слово ищется как префикс, слова объединяются через AND.
+    # Пустая строка, если в тексте нет слов: тогда поиск выполняется через LIKE
+    return " ".join(f'"{word}"*' for word in _WORDS.findall(text))
+
+
+class SqlTableModel(QAbstractTableModel):
+    # Строки читаются порциями по мере прокрутки. Следующая порция
+    # выбирается по ключу последней загруженной строки (keyset-пагинация),
+    # поэтому стоимость запроса не растёт с номером страницы.
+    # При background = True порции читаются в рабочем потоке.
+    # search: полнотекстовые индексы [(таблица FTS5, выражение, которому соответствует её rowid)];
+    # без них или без FTS5 поиск сравнивает показанный текст каждой строки через LIKE
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, columns, source, key, where="", params=(), chunk_size=CHUNK_SIZE, search=(), parent=None):
+        super().__init__(parent)
+        # Столбец: (заголовок, выражение SQL) или (заголовок, выражение SQL, функция форматирования)
+        self.headers = [column[0] for column in columns]
+        self.expressions = [column[1] for column in columns]
+        self.formatters = [column[2] if len(column) > 2 else str for column in columns]
+        self.source = source
+        self.key = key
+        self.where = where
+        self.params = tuple(params)
+        self.chunk_size = chunk_size
+        self.search = [(table, expression) for table, expression in search if db.has_table(table)]
+        self.sort_column = -1
+        self.sort_order = Qt.SortOrder.AscendingOrder
+        self.filter_text = ""
+        self.background = False
+        self._rows = []
+        self._last = None
+        self._exhausted = False
+        self._loading = False
+        self._generation = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return self.formatters[index.column()](self._rows[index.row()][index.column()])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._loading:
+            return
+        if not self.background:
+            self._append_rows(db.fetch_all(*self._page_query()))
+            return
+        self._loading = True
+        generation = self._generation
+        query = self._page_query()
+        workers.start(lambda task: (generation, db.fetch_all(*query)),
+                      on_finished=self._page_loaded,
+                      on_failed=lambda message: self._page_failed((generation, message)))
+
+    def _append_rows(self, rows):
+        self._exhausted = len(rows) < self.chunk_size
+        if not rows:
+            return
+        self._last = rows[-1][-2:]
+        self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+        self._rows.extend(row[:-2] for row in rows)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sort_column = column
+        self.sort_order = order
+        self.refresh()
+
+    def set_filter(self, text):
+        self.filter_text = text.strip()
+        self.refresh()
+
+    def refresh(self):
+        self._generation += 1
+        self.beginResetModel()
+        self._rows = []
+        self._last = None
+        self._exhausted = False
+        self._loading = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def _page_loaded(self, result):
+        generation, rows = result
+        # Результат устаревшего запроса (фильтр или сортировка уже сменились) отбрасывается
+        if generation != self._generation:
+            return
+        self._loading = False
+        self._append_rows(rows)
+
+    def _page_failed(self, result):
+        generation, message = result
+        # Ошибка запроса, который уже заменён новым, текущую таблицу не затрагивает
+        if generation != self._generation:
+            return
+        self._loading = False
+        self._exhausted = True
+        self.load_failed.emit(message)
+
+    def row_values(self, row):
+        return self._rows[row]
+
+    def _sort_expression(self):
+        if 0 <= self.sort_column < len(self.expressions):
+            return self.expressions[self.sort_column]
+        return self.key
+
+    def _page_query(self):
+        sort_expression = self._sort_expression()
+        descending = self.sort_order == Qt.SortOrder.DescendingOrder
+        conditions = []
+        params = []
+
+        if self.where:
+            conditions.append(f"({self.where})")
+            params.extend(self.params)
+
+        if self.filter_text:
+            condition, filter_params = self._filter_condition()
+            conditions.append(condition)
+            params.extend(filter_params)
+
+        if self._last is not None:
+            condition, keyset_params = self._keyset_condition(sort_expression, descending)
+            conditions.append(condition)
+            params.extend(keyset_params)
+
+        direction = "DESC" if descending else "ASC"
+        order_by = f"{self.key} {direction}" if sort_expression == self.key \
+            else f"{sort_expression} {direction}, {self.key} {direction}"
+        sql = (f"SELECT {', '.join(self.expressions)}, {sort_expression}, {self.key} FROM {self.source}"
+               + (" WHERE " + " AND ".join(conditions) if conditions else "")
+               + f" ORDER BY {order_by} LIMIT {self.chunk_size}")
+        return sql, params
+
+    def _filter_condition(self):
+        query = match_query(self.filter_text)
+        if not self.search or not query:
+            return self._like_condition()
+        conditions = [f"{expression} IN (SELECT rowid FROM {table} WHERE {table} MATCH ?)"
+                      for table, expression in self.search]
+        params = [query] * len(conditions)
+        # Числовые идентификаторы в индексах нет, они ищутся на точное совпадение
+        if self.filter_text.isdigit():
+            conditions.append(f"{self.key} = ?")
+            params.append(int(self.filter_text))
+        return "(" + " OR ".join(conditions) + ")", params
+
+    def _like_condition(self):
+        text = self.filter_text.casefold()
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        expressions = [expression for expression in map(self._displayed_expression, self.expressions, self.formatters)
+                       if expression is not None]
+        condition = "(" + " OR ".join(f"{expression} LIKE ? ESCAPE '\\'" for expression in expressions) + ")"
+        return condition, [pattern] * len(expressions)
+
+    def _displayed_expression(self, expression, formatter):
+        # Сравнивается текст в том виде, в каком он показан в таблице, без учёта регистра.
+        # Столбцы, форматирование которых недоступно в SQL, в поиске не участвуют
+        if formatter in (str, text_or_empty):
+            return f"casefold({expression})"
+        if db.SQL_FUNCTIONS.get(formatter.__name__) is formatter:
+            return f"casefold({formatter.__name__}({expression}))"
+        return None
+
+    def _keyset_condition(self, sort_expression, descending):
+        value, key = self._last
+        op = "<" if descending else ">"
+        if sort_expression == self.key:
+            return f"{self.key} {op} ?", [key]
+        # NULL в SQLite меньше любого значения: при возрастании идут первыми, при убывании последними
+        if value is None:
+            if descending:
+                return f"({sort_expression} IS NULL AND {self.key} < ?)", [key]
+            return f"(({sort_expression} IS NULL AND {self.key} > ?) OR {sort_expression} IS NOT NULL)", [key]
+        condition = f"({sort_expression} {op} ? OR ({sort_expression} = ? AND {self.key} {op} ?)"
+        if descending:
+            condition += f" OR {sort_expression} IS NULL"
+        return condition + ")", [value, value, key]
+
+
+class HistoryTableModel(SqlTableModel):
+    # По умолчанию новые записи сверху
+    def __init__(self, columns, parent=None):
+        super().__init__(columns, "ИсторияИзменений", "ID", search=[(history.FTS_TABLE, "ID")], parent=parent)
+        self.sort_order = Qt.SortOrder.DescendingOrder
+
+    def set_entity(self, entity):
+        self.where, self.params = ("Объект = ?", (entity,)) if entity else ("", ())
+        self.refresh()
+
+
+class SqlTableView(QWidget):
+    def __init__(self, model=None, parent=None):
+        super().__init__(parent)
+        self.search_field = QLineEdit()
+        self.search_field.setPlaceholderText("Поиск")
+        self.search_field.setClearButtonEnabled(True)
+        self.table = QTableView()
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
+
+        # Фильтр применяется после паузы в наборе, а не на каждую букву
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(300)
+        self._filter_timer.timeout.connect(self._apply_filter)
+        self.search_field.textChanged.connect(self._filter_timer.start)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.search_field)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+        if model is not None:
+            self.set_model(model)
+
+    def model(self):
+        return self.table.model()
+
+    def set_model(self, model):
+        model.filter_text = self.search_field.text().strip()
+        model.background = True
+        model.load_failed.connect(self._show_error)
+        self.table.setModel(model)
+        model.refresh()
+
+    def refresh(self):
+        if self.model() is not None:
+            self.model().refresh()
+
+    def _apply_filter(self):
+        if self.model() is not None:
+            self.model().set_filter(self.search_field.text())
+
+    def _show_error(self, message):
+        QMessageBox.warning(self, "Ошибка", f"Ошибка базы данных: {message}")
+
+
+# Поиск по товарам: наименование, вес и цена в показанном виде
+def products_model(hide_id=False, parent=None):
+    columns = [("ID", "ID_товара"),
+               ("Наименование", "Наименование"),
+               ("Вес, гр", "Вес", units.format_weight),
+               ("Стоимость, руб", "Стоимость", units.format_price),
+               ("Количество, шт", "Количество")]
+    return SqlTableModel(columns[1:] if hide_id else columns, "Товары", "ID_товара",
+                         search=[(PRODUCTS_FTS, "ID_товара")], parent=parent)
+
+
+def orders_model(parent=None):
+    columns = [("ID заказа", "Заказы.ID_заказа"),
+               ("Пользователь", "Пользователи.Логин"),
+               ("Товар", "Товары.Наименование"),
+               ("Количество, шт", "Заказы.Количество"),
+               ("Статус", "Заказы.Статус")]
+    source = ("Заказы JOIN Пользователи ON Заказы.ID_пользователя = Пользователи.ID_пользователя "
+              "JOIN Товары ON Заказы.ID_товара = Товары.ID_товара")
+    return SqlTableModel(columns, source, "Заказы.ID_заказа",
+                         search=[(PRODUCTS_FTS, "Заказы.ID_товара"), (USERS_FTS, "Заказы.ID_пользователя")],
+                         parent=parent)
+
+
+def user_orders_model(user_id, parent=None):
+    columns = [("ID заказа", "Заказы.ID_заказа"),
+               ("Наименование товара", "Товары.Наименование"),
+               ("Количество, шт", "Заказы.Количество"),
+               ("Цена за единицу, руб", "Товары.Стоимость", units.format_price),
+               ("Стоимость заказа, руб", "(Заказы.Количество * Товары.Стоимость)", units.format_price)]
+    source = "Заказы JOIN Товары ON Заказы.ID_товара = Товары.ID_товара"
+    return SqlTableModel(columns, source, "Заказы.ID_заказа", where="Заказы.ID_пользователя = ?",
+                         params=(user_id,), search=[(PRODUCTS_FTS, "Заказы.ID_товара")], parent=parent)
+
+
+def text_or_empty(value):
+    return "" if value is None else str(value)
+
+
+def changes_model(parent=None):
+    # Записи, сделанные до структурированной истории, содержат только описание
+    columns = [("ID", "ID"),
+               ("Время", "Время", text_or_empty),
+               ("Пользователь", "Пользователь", text_or_empty),
+               ("Объект", "Объект", text_or_empty),
+               ("Действие", "Действие", text_or_empty),
+               ("Описание", "Описание")]
+    return HistoryTableModel(columns, parent=parent)
@@ -0,0 +1,32 @@
+import math
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
+# Стоимость хранится в базе целым числом копеек, чтобы суммы не теряли точность
+def parse_price(text):
+    try:
+        value = Decimal(text.strip().replace(",", "."))
+    except InvalidOperation:
+        raise ValueError(f"Некорректная цена: {text}")
+    if not value.is_finite() or value < 0:
+        raise ValueError(f"Некорректная цена: {text}")
+    return int((value * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def format_price(kopecks):
+    if kopecks is None:
+        return ""
+    return f"{kopecks / 100:.2f}"
+
+
+def parse_weight(text):
+    value = float(text.strip().replace(",", "."))
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f"Некорректный вес: {text}")
+    return value
+
+
+def format_weight(grams):
+    if grams is None:
+        return ""
+    return f"{grams:g}"
@@ -0,0 +1,101 @@
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+import db
+
+# Заказ, повторяющий попытки при занятой базе, может выполняться десятки секунд:
+# дольше выход из приложения его не ждёт
+SHUTDOWN_TIMEOUT_MS = 3000
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class TaskSignals(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    done = pyqtSignal()
+
+
+class Task(QRunnable):
+    # Функция задачи получает первым аргументом саму задачу и может
+    # вызывать report_progress(); отмена срабатывает на ближайшем вызове
+    def __init__(self, func, *args, **kwargs):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def report_progress(self, done, total=100):
+        if self.is_cancelled():
+            raise TaskCancelled()
+        if total:
+            self.signals.progress.emit(min(100, int(done * 100 / total)))
+
+    def run(self):
+        try:
+            with db.get_pool().use_thread_connection():
+                result = self.func(self, *self.args, **self.kwargs)
+            if self.is_cancelled():
+                raise TaskCancelled()
+        except TaskCancelled:
+            self._emit("cancelled")
+        except Exception as e:
+            self._emit("failed", str(e))
+        else:
+            self._emit("finished", result)
+        finally:
+            self._emit("done")
+
+    def _emit(self, name, *args):
+        # Задача, не успевшая завершиться за SHUTDOWN_TIMEOUT_MS, доработает уже после выхода
+        # из приложения, когда объект сигналов удалён: результат тогда просто отбрасывается
+        try:
+            getattr(self.signals, name).emit(*args)
+        except RuntimeError:
+            pass
+
+
+_active = set()
+
+
+def start(func, *args, on_finished=None, on_failed=None, on_progress=None, on_cancelled=None, **kwargs):
+    task = Task(func, *args, **kwargs)
+    if on_finished is not None:
+        task.signals.finished.connect(on_finished)
+    if on_failed is not None:
+        task.signals.failed.connect(on_failed)
+    if on_progress is not None:
+        task.signals.progress.connect(on_progress)
+    if on_cancelled is not None:
+        task.signals.cancelled.connect(on_cancelled)
+    # Ссылка держится до доставки сигналов в поток интерфейса
+    _active.add(task)
+    task.signals.done.connect(lambda: _active.discard(task))
+    pool = QThreadPool.globalInstance()
+    # Потоки пула не завершаются по простою: у каждого своё соединение с базой,
+    # и новые потоки открывали бы всё новые соединения
+    pool.setExpiryTimeout(-1)
+    pool.start(task)
+    return task
+
+
+def shutdown():
+    # При выходе из приложения незавершённые задачи отменяются и дожидаются остановки.
+    # Соединения рабочих потоков закрываются, только если все задачи успели завершиться
+    for task in list(_active):
+        task.cancel()
+    if QThreadPool.globalInstance().waitForDone(SHUTDOWN_TIMEOUT_MS):
+        db.get_pool().close_thread_connections()